@@ -1,64 +1,3117 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import atexit
+import csv
+import fnmatch
+import gzip
+import io
 import json
+import platform
+import sqlite3
+import argparse
+import base64
+import copy
+import hashlib
+import html
+import http.client
+import queue
 import venv
 import subprocess
 import os
+import re
 import sys
 import shutil
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import url2pathname
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import threading
 import logging
-from logging.handlers import RotatingFileHandler
+import time
+import uuid
+from contextlib import closing, contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves %-formatting to the listener thread.
+
+    The stock prepare() merges the arguments into the message in the calling
+    thread; the queue never leaves this process, so the record can be passed
+    through and the pipeline never pays for formatting. List, dict and set
+    arguments are copied first, since callers often go on to change them;
+    other mutable objects are formatted as they are when the listener gets
+    to the record.
+    """
+
+    @staticmethod
+    def snapshot(value):
+        return copy.copy(value) if isinstance(value, (list, dict, set)) else value
+
+    def prepare(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(self.snapshot(arg) for arg in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {key: self.snapshot(value) for key, value in record.args.items()}
+        return record
+
+def compress_log(source, dest):
+    """Gzip a rotated log file, then remove the uncompressed copy."""
+    try:
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+    except OSError as e:
+        logging.getLogger('VenvCreator').warning("Failed to compress %s: %s", source, e)
+
+def rotate_log(source, dest):
+    """Rotator for the daily log: rename at once, compress in the background."""
+    rotated = dest[:-len('.gz')]
+    os.replace(source, rotated)
+    threading.Thread(target=compress_log, args=(rotated, dest), daemon=True).start()
+
+OLD_DAILY_LOG_PATTERN = re.compile(r'^venv_creator_(\d{4})(\d{2})(\d{2})\.log(\.gz)?$')
+
+def compress_stale_logs(log_dir, active_file):
+    """Compress rotated logs left uncompressed, e.g. by an exit mid-compression.
+
+    Per-day files from before the rotating handler are renamed to its
+    venv_creator.log.YYYY-MM-DD.gz scheme so backupCount expires them too.
+    """
+    for name in os.listdir(log_dir):
+        path = os.path.join(log_dir, name)
+        old_daily = OLD_DAILY_LOG_PATTERN.match(name)
+        if old_daily:
+            year, month, day, compressed = old_daily.groups()
+            dest = os.path.join(log_dir, f'venv_creator.log.{year}-{month}-{day}.gz')
+            if os.path.exists(dest):
+                continue
+            if compressed:
+                os.replace(path, dest)
+            else:
+                compress_log(path, dest)
+        elif name.startswith('venv_creator') and '.log' in name and not name.endswith('.gz') and path != active_file:
+            compress_log(path, path + '.gz')
 
 # Set up logging
 def setup_logging():
     try:
         log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
         os.makedirs(log_dir, exist_ok=True)
-        
-        # Add timestamp to log filename
-        log_file = os.path.join(log_dir, f'venv_creator_{datetime.now().strftime("%Y%m%d")}.log')
+        log_file = os.path.join(log_dir, 'venv_creator.log')
         
         # Improve formatter with more details
         log_format = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
         
-        # Add file handler with rotation by size and backup count
-        file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=10)
+        # Roll over daily at midnight; rotated days are gzipped off the logging thread
+        file_handler = TimedRotatingFileHandler(log_file, when='midnight', backupCount=30, encoding='utf-8')
+        file_handler.namer = lambda name: name + '.gz'
+        file_handler.rotator = rotate_log
         file_handler.setFormatter(logging.Formatter(log_format))
         
-        # Add console handler with simpler format for readability
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+        # Add console handler with simpler format for readability
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+        
+        # Callers only enqueue records; formatting and I/O happen on the listener thread
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        
+        logger = logging.getLogger('VenvCreator')
+        logger.setLevel(logging.DEBUG)
+        logger.handlers = []  # Clear existing handlers
+        logger.addHandler(DeferredQueueHandler(log_queue))
+        
+        threading.Thread(target=compress_stale_logs, args=(log_dir, log_file), daemon=True).start()
+        return logger
+    except Exception as e:
+        print(f"Failed to setup logging: {str(e)}")
+        return logging.getLogger('VenvCreator')
+
+# Initialize logger
+logger = setup_logging()
+
+# Per-user cache directory shared by every creator cache
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.venv_creator')
+WHEELHOUSE_DIR = os.path.join(CACHE_DIR, 'wheelhouse')
+
+# Chrome trace-event files from project creation, next to the logs; the newest TRACE_RETENTION are kept
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+TRACE_RETENTION = 20
+
+# Per-project record of creator state (deferred profiles, locks, ...)
+PROJECT_METADATA_FILE = '.venv_creator.json'
+
+# Hash-pinned lockfile written next to each project's requirements
+LOCK_FILE = 'requirements.lock'
+
+# Install stamp kept inside each venv so unchanged re-syncs are a no-op
+SYNC_STAMP_FILE = '.creator-sync.json'
+PROTECTED_DISTRIBUTIONS = {'pip', 'setuptools', 'wheel'}
+
+# Development requirements grouped into install profiles; anything not listed is core
+PROFILE_NAMES = ['core', 'test', 'lint', 'docs', 'security']
+INSTALL_PROFILES = {
+    'test': ['pytest', 'pytest-cov'],
+    'lint': ['mypy', 'types-setuptools', 'black', 'isort', 'flake8', 'pre-commit'],
+    'docs': ['sphinx', 'sphinx-rtd-theme'],
+    'security': ['bandit', 'safety'],
+}
+
+class ProjectTemplate:
+    def __init__(self, name, description, structure, requirements=None, configs=None, profiles=None):
+        self.name = name
+        self.description = description
+        self.structure = structure
+        self.requirements = requirements or []
+        self.configs = configs or {}
+        self.profiles = profiles or ['core', 'test']
+
+    def get_requirements(self):
+        return self.requirements
+
+    def get_config_files(self):
+        return self.configs
+
+class Tracer:
+    """Record nested spans with nanosecond timings and export Chrome trace events.
+
+    Spans nest by time within each thread, which is how chrome://tracing and
+    Perfetto draw them. Nothing is recorded until start(), so span() costs
+    next to nothing in normal runs. Each start() begins a new run, and only
+    spans that began during the current run are kept, so work a previous
+    run left behind in background threads doesn't leak into this trace.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.run = 0
+        self.events = []
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.run += 1
+            self.events = []
+            self.thread_names = {}
+            self.origin = time.perf_counter_ns()
+            self.enabled = True
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+
+    @contextmanager
+    def span(self, name, category='function', **attributes):
+        """Time the enclosed block; the yielded dict collects the span's attributes."""
+        if not self.enabled:
+            yield attributes
+            return
+        run = self.run
+        start = time.perf_counter_ns()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes['error'] = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            thread = threading.current_thread()
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                     'ts': (start - self.origin) / 1000, 'dur': (end - start) / 1000, 'args': attributes}
+            with self.lock:
+                if self.enabled and self.run == run:
+                    self.events.append(event)
+                    self.thread_names.setdefault(thread.ident, thread.name)
+
+    def export(self, path):
+        """Write the recorded spans as Chrome trace-event JSON."""
+        with self.lock:
+            events = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0,
+                       'args': {'name': 'Universal Python Project Creator'}}]
+            events += [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                       for tid, name in self.thread_names.items()]
+            events += sorted(self.events, key=lambda event: event['ts'])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+        logger.info("Wrote %s trace events to %s", len(events), path)
+
+tracer = Tracer()
+
+def run_traced(args, **kwargs):
+    """subprocess.run inside a 'subprocess' span."""
+    name = ' '.join([os.path.basename(str(args[0]))] + [str(arg)[:40] for arg in args[1:4]])
+    with tracer.span(name, 'subprocess', argv=[str(arg) for arg in args]) as span:
+        result = subprocess.run(args, **kwargs)
+        span['returncode'] = result.returncode
+        return result
+
+def get_venv_bin(venv_path, name):
+    """Return the path of an executable inside a virtual environment."""
+    bin_dir = 'Scripts' if sys.platform == 'win32' else 'bin'
+    if sys.platform == 'win32' and not name.endswith('.exe'):
+        name += '.exe'
+    return os.path.join(venv_path, bin_dir, name)
+
+def read_pyvenv_cfg(venv_path):
+    """Parse pyvenv.cfg into a dict, returning {} when it is missing."""
+    config = {}
+    try:
+        with open(os.path.join(venv_path, 'pyvenv.cfg'), 'r', encoding='utf-8') as f:
+            for line in f:
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    config[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return config
+
+def find_site_packages(venv_path):
+    """Locate the site-packages directory of a virtual environment."""
+    if sys.platform == 'win32':
+        candidate = os.path.join(venv_path, 'Lib', 'site-packages')
+        return candidate if os.path.isdir(candidate) else None
+    lib_dir = os.path.join(venv_path, 'lib')
+    try:
+        for entry in sorted(os.listdir(lib_dir)):
+            candidate = os.path.join(lib_dir, entry, 'site-packages')
+            if entry.startswith('python') and os.path.isdir(candidate):
+                return candidate
+    except OSError:
+        pass
+    return None
+
+def get_disk_usage(path):
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+def normalize_name(name):
+    """Normalise a distribution name as described in PEP 503."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def version_key(version):
+    """Sort key for PEP 440 style versions without third-party dependencies."""
+    match = re.match(r'^v?(\d+(?:\.\d+)*)(?:[-_.]?(a|b|rc|alpha|beta|c)[-_.]?(\d*))?'
+                     r'(?:[-_.]?post[-_.]?(\d*))?(?:[-_.]?dev[-_.]?(\d*))?', version.strip().lower())
+    if not match:
+        return ((-1,), version)
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    pre_rank = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'c': 2, 'rc': 2}
+    if match.group(2):
+        pre = (pre_rank[match.group(2)], int(match.group(3) or 0))
+    elif match.group(5) is not None and match.group(4) is None:
+        pre = (-1, 0)  # Plain dev releases sort before pre-releases
+    else:
+        pre = (3, 0)
+    post = int(match.group(4) or 0) if match.group(4) is not None else -1
+    dev = int(match.group(5) or 0) if match.group(5) is not None else float('inf')
+    return (release, pre, post, dev)
+
+def parse_artifact_filename(filename):
+    """Return (name, version) for a wheel or sdist filename, or None."""
+    if filename.endswith('.whl'):
+        parts = filename[:-4].split('-')
+        if len(parts) >= 5:
+            return parts[0], parts[1]
+        return None
+    for suffix in ('.tar.gz', '.zip', '.tar.bz2'):
+        if filename.endswith(suffix):
+            stem = filename[:-len(suffix)]
+            if '-' in stem:
+                name, version = stem.rsplit('-', 1)
+                return name, version
+    return None
+
+# Requirements-file options that steer the whole install, forwarded as pip arguments
+REQUIREMENTS_INSTALL_OPTIONS = {
+    '-i': '--index-url', '--index-url': '--index-url', '--extra-index-url': '--extra-index-url',
+    '-f': '--find-links', '--find-links': '--find-links', '--trusted-host': '--trusted-host',
+    '--no-index': '--no-index', '--pre': '--pre', '--prefer-binary': '--prefer-binary',
+    '--only-binary': '--only-binary', '--no-binary': '--no-binary',
+}
+
+def split_requirements_option(line):
+    """Split '-r base.txt', '-rbase.txt' or '--requirement=base.txt' into (option, value)."""
+    if line.startswith('--'):
+        match = re.match(r'^(--[\w-]+)(?:\s*=\s*|\s+|$)(.*)$', line)
+    else:
+        match = re.match(r'^(-\w)\s*(.*)$', line)
+    return (match.group(1), match.group(2).strip()) if match else (line, '')
+
+def parse_requirements_file(path, seen=None):
+    """Read a requirements file the way pip does.
+
+    Returns (requirement lines, pip arguments). Continuation lines are
+    joined, comments and per-line --hash options dropped, -r files are
+    followed and -c files, -e paths and relative --find-links resolved
+    against the file's directory. Index and constraint options come back
+    as install arguments.
+    """
+    path = os.path.abspath(path)
+    seen = set() if seen is None else seen
+    if path in seen:
+        return [], []
+    seen.add(path)
+    base_dir = os.path.dirname(path)
+    
+    def local_path(value):
+        candidate = os.path.normpath(os.path.join(base_dir, value))
+        return candidate if '://' not in value and os.path.exists(candidate) else value
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        content = re.sub(r'\\\r?\n', ' ', f.read())
+    requirements, install_args = [], []
+    for line in content.splitlines():
+        # Like pip, '#' only starts a comment at the line start or after whitespace (keeps URL fragments)
+        line = re.sub(r'(^|\s)#.*$', '', line).strip()
+        if not line:
+            continue
+        if not line.startswith('-'):
+            requirements.append(re.sub(r'\s+--hash[=\s]\S+', '', line).strip())
+            continue
+        option, value = split_requirements_option(line)
+        if option in ('-r', '--requirement'):
+            nested_requirements, nested_args = parse_requirements_file(local_path(value), seen)
+            requirements += nested_requirements
+            install_args += nested_args
+        elif option in ('-c', '--constraint'):
+            install_args += ['--constraint', local_path(value)]
+        elif option in ('-e', '--editable'):
+            requirements.append(f"-e {local_path(value)}")
+        elif option in REQUIREMENTS_INSTALL_OPTIONS:
+            flag = REQUIREMENTS_INSTALL_OPTIONS[option]
+            install_args += [flag, local_path(value) if flag == '--find-links' else value] if value else [flag]
+        else:
+            logger.warning("Ignoring unsupported option %r in %s", line, path)
+    return requirements, install_args
+
+def read_requirements_file(path):
+    """Return the requirement lines of a requirements file, following -r includes."""
+    return parse_requirements_file(path)[0]
+
+REQUIREMENT_PATTERN = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*([^;]*?)\s*(;.*)?$')
+
+def requirement_name(requirement):
+    """The distribution name at the start of any requirement line, even ones
+    parse_requirement() can't handle (direct references, per-line options)."""
+    egg = re.search(r'#egg=([A-Za-z0-9][A-Za-z0-9._-]*)', requirement)
+    if egg:
+        # Editable lines name their distribution in the URL fragment
+        return egg.group(1)
+    match = re.match(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)', requirement)
+    return match.group(1) if match else requirement.strip()
+
+def parse_requirement(requirement):
+    """Split a requirement line into (name, extras, specifier clauses, marker)."""
+    match = REQUIREMENT_PATTERN.match(requirement)
+    if not match:
+        raise ValueError(f"Unsupported requirement: {requirement}")
+    name, extras, specifier, marker = match.groups()
+    extras = {e.strip() for e in extras[1:-1].split(',') if e.strip()} if extras else set()
+    clauses = []
+    for clause in specifier.split(','):
+        clause = clause.strip()
+        if clause:
+            op_match = re.match(r'^(===|==|!=|~=|>=|<=|>|<)\s*(\S+)$', clause)
+            if not op_match:
+                raise ValueError(f"Unsupported specifier '{clause}' in {requirement}")
+            clauses.append(op_match.groups())
+    return name, extras, clauses, (marker or '').lstrip(';').strip()
+
+def specifiers_satisfiable(clauses):
+    """Cheap up-front check that the intersection of clauses isn't empty."""
+    lower, upper = None, None  # (version_key, inclusive)
+    for op, version in clauses:
+        if op in ('==', '===') and version.endswith('.*'):
+            op, version = '>=', version[:-2]
+        if op == '~=':
+            parts = version.split('.')
+            bumped = parts[:-1] if len(parts) > 1 else parts
+            bumped[-1] = str(int(re.match(r'\d+', bumped[-1]).group()) + 1)
+            clauses_to_apply = [('>=', version), ('<', '.'.join(bumped))]
+        elif op in ('==', '==='):
+            clauses_to_apply = [('>=', version), ('<=', version)]
+        elif op == '!=':
+            continue
+        else:
+            clauses_to_apply = [(op, version)]
+        for bound_op, bound_version in clauses_to_apply:
+            key = version_key(bound_version)
+            if bound_op.startswith('>'):
+                candidate = (key, bound_op == '>=')
+                if lower is None or candidate[0] > lower[0] or (candidate[0] == lower[0] and not candidate[1]):
+                    lower = candidate
+            else:
+                candidate = (key, bound_op == '<=')
+                if upper is None or candidate[0] < upper[0] or (candidate[0] == upper[0] and not candidate[1]):
+                    upper = candidate
+    if lower is None or upper is None:
+        return True
+    return lower[0] < upper[0] or (lower[0] == upper[0] and lower[1] and upper[1])
+
+def merge_requirements(sources):
+    """Merge requirement lists into one install set.
+
+    sources is a list of (label, requirements) in priority order. Names are
+    normalised and specifiers intersected; when an intersection is empty the
+    higher-priority source wins and the conflict is logged. Entries whose
+    markers differ are kept apart, and lines this parser doesn't understand
+    (direct references, per-line options) are passed through to pip as they
+    are. Standard library names that sometimes end up in requirements files
+    are dropped.
+    """
+    stdlib_names = getattr(sys, 'stdlib_module_names', {'tkinter'})
+    merged = {}
+    for label, requirements in sources:
+        for requirement in requirements:
+            try:
+                name, extras, clauses, marker = parse_requirement(requirement)
+            except ValueError:
+                merged.setdefault(('raw', requirement.strip()), {'raw': requirement.strip()})
+                continue
+            key = (normalize_name(name), marker)
+            if name in stdlib_names:
+                logger.debug("Skipping standard library requirement '%s' from %s", name, label)
+                continue
+            if key not in merged:
+                merged[key] = {'name': name, 'extras': set(extras), 'clauses': list(clauses),
+                               'marker': marker, 'sources': [label]}
+                continue
+            entry = merged[key]
+            entry['extras'] |= extras
+            combined = entry['clauses'] + [c for c in clauses if c not in entry['clauses']]
+            if specifiers_satisfiable(combined):
+                entry['clauses'] = combined
+            else:
+                logger.warning("Conflicting requirements for %s: keeping %s's specifier over '%s' from %s",
+                               name, entry['sources'][0], requirement, label)
+            entry['sources'].append(label)
+    
+    lines = []
+    for entry in merged.values():
+        if 'raw' in entry:
+            lines.append(entry['raw'])
+            continue
+        line = entry['name']
+        if entry['extras']:
+            line += f"[{','.join(sorted(entry['extras']))}]"
+        line += ','.join(op + version for op, version in entry['clauses'])
+        if entry['marker']:
+            line += f"; {entry['marker']}"
+        lines.append(line)
+    return lines
+
+def poetry_add_args(requirement):
+    """Translate a pip requirement line into `poetry add` arguments.
+
+    Raises ValueError for lines Poetry has no equivalent for.
+    """
+    # Per-line pip options such as --hash mean nothing to Poetry
+    requirement = requirement.split(' --', 1)[0].strip()
+    requirement, _, marker = requirement.partition(';')
+    marker_args = ['--markers', marker.strip()] if marker.strip() else []
+    if '@' in requirement:
+        # Direct reference: Poetry takes the URL itself
+        return [requirement.split('@', 1)[1].strip()] + marker_args
+    name, extras, clauses, _ = parse_requirement(requirement)
+    if any(op == '===' for op, version in clauses):
+        raise ValueError(f"Poetry has no arbitrary-equality operator: {requirement}")
+    spec = name + (f"[{','.join(sorted(extras))}]" if extras else '')
+    return [spec + ','.join(op + version for op, version in clauses)] + marker_args
+
+def get_requirement_profile(requirement):
+    key = normalize_name(requirement_name(requirement))
+    for profile, names in INSTALL_PROFILES.items():
+        if key in names:
+            return profile
+    return 'core'
+
+def split_requirements_by_profile(requirements):
+    by_profile = {}
+    for requirement in requirements:
+        by_profile.setdefault(get_requirement_profile(requirement), []).append(requirement)
+    return by_profile
+
+def load_project_metadata(project_path):
+    try:
+        with open(os.path.join(project_path, PROJECT_METADATA_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_project_metadata(project_path, metadata):
+    with open(os.path.join(project_path, PROJECT_METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+def write_deferred_profiles(project_path, deferred):
+    """Record profiles that weren't installed and generate the commands to install them later."""
+    metadata = load_project_metadata(project_path)
+    metadata['deferred_profiles'] = sorted(deferred)
+    save_project_metadata(project_path, metadata)
+    if not deferred:
+        return
+    
+    os.makedirs(os.path.join(project_path, 'requirements'), exist_ok=True)
+    python = '.venv/Scripts/python' if sys.platform == 'win32' else '.venv/bin/python'
+    makefile = ["# Lazily installed dependency profiles: run `make -f profiles.mk install-<profile>`",
+                f"PYTHON ?= {python}", ""]
+    for profile in sorted(deferred):
+        with open(os.path.join(project_path, 'requirements', f'{profile}.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(deferred[profile]) + "\n")
+        makefile += [f"install-{profile}: .venv/.profile-{profile}", "",
+                     f".venv/.profile-{profile}: requirements/{profile}.txt",
+                     f"\t$(PYTHON) -m pip install -r requirements/{profile}.txt",
+                     "\ttouch $@", ""]
+    with open(os.path.join(project_path, 'profiles.mk'), 'w', encoding='utf-8') as f:
+        f.write("\n".join(makefile))
+    logger.info("Deferred install profiles: %s", ', '.join(sorted(deferred)))
+
+def install_deferred_profiles(project_path, profiles, index_url=None):
+    """Install previously deferred profiles into the project's .venv."""
+    metadata = load_project_metadata(project_path)
+    deferred = metadata.get('deferred_profiles', [])
+    venv_path = os.path.join(project_path, '.venv')
+    for profile in profiles:
+        if profile not in deferred:
+            logger.info("Profile '%s' is not deferred in %s", profile, project_path)
+            continue
+        requirements_file = os.path.join(project_path, 'requirements', f'{profile}.txt')
+        run_traced([get_venv_bin(venv_path, 'python'), '-m', 'pip', 'install',
+                    *get_index_args(index_url), '-r', requirements_file], check=True)
+        Path(os.path.join(venv_path, f'.profile-{profile}')).touch()
+        deferred.remove(profile)
+    metadata['deferred_profiles'] = deferred
+    save_project_metadata(project_path, metadata)
+
+def read_pip_report(report_path, index_urls=()):
+    """Turn a `pip install --report` file into (lock entries, unhashed requirements).
+
+    pip only reports the one file it picked for this machine, so every other
+    file the indexes publish for that release is locked too; otherwise a
+    hash-checked install on another platform could not use its own wheel.
+    VCS checkouts, local directories and files no index publishes a hash
+    for come back as requirement lines to install without hash checking.
+    """
+    with open(report_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    pool = HTTPConnectionPool()
+    
+    def lock_entry(item):
+        name, version = item['metadata']['name'], item['metadata']['version']
+        download_info = item.get('download_info', {})
+        url = download_info.get('url', '')
+        archive_info = download_info.get('archive_info')
+        if archive_info is None:
+            vcs_info = download_info.get('vcs_info')
+            if vcs_info:
+                requirement = f"{name} @ {vcs_info['vcs']}+{url}@{vcs_info['commit_id']}"
+            elif download_info.get('dir_info', {}).get('editable'):
+                requirement = f"-e {url}#egg={name}"
+            else:
+                requirement = f"{name} @ {url}"
+            logger.warning("%s comes from %s, a VCS checkout or local directory; "
+                           "installing it without hash checking", name, url)
+            return None, requirement
+        filename = unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+        hashes = archive_info.get('hashes') or {}
+        if not hashes and '=' in archive_info.get('hash', ''):
+            hashes = dict([archive_info['hash'].split('=', 1)])
+        sha256 = hashes.get('sha256')
+        if sha256 is None and urlsplit(url).scheme == 'file':
+            sha256 = file_sha256(url2pathname(urlsplit(url).path))
+        published = index_release_files(name, version, index_urls, pool)
+        sha256 = sha256 or published.get(filename)
+        if sha256 is None:
+            logger.warning("No sha256 is known for %s (%s %s); installing it without hash checking",
+                           filename, name, version)
+            return None, f"{name} @ {url}"
+        files = [{'filename': filename, 'sha256': sha256}]
+        files += [{'filename': other, 'sha256': digest}
+                  for other, digest in sorted(published.items()) if other != filename]
+        return {'name': name, 'version': version, 'files': files}, None
+    
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lock_entry, report.get('install', [])))
+    finally:
+        pool.close()
+    return ([entry for entry, _ in results if entry],
+            [requirement for _, requirement in results if requirement])
+
+def read_poetry_lock(poetry_lock_path, site_packages):
+    """Turn poetry.lock into lock entries carrying every published file's hash.
+
+    poetry.lock covers every platform without markers (pywin32 and the
+    like), so only the packages Poetry actually installed into
+    site_packages, at the locked version, are kept.
+    """
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuntimeError("reading poetry.lock needs Python 3.11+ or the tomli package") from None
+    with open(poetry_lock_path, 'rb') as f:
+        data = tomllib.load(f)
+    installed = get_installed_distributions(site_packages)
+    entries = []
+    for package in data.get('package', []):
+        current = installed.get(normalize_name(package['name']))
+        if current is None or version_key(current[1]) != version_key(package['version']):
+            continue
+        files = [{'filename': file_info['file'], 'sha256': file_info['hash'].split(':', 1)[1]}
+                 for file_info in package.get('files', []) if file_info.get('hash', '').startswith('sha256:')]
+        if files:
+            entries.append({'name': package['name'], 'version': package['version'], 'files': files})
+    return entries
+
+def write_lockfile(lock_path, entries):
+    if not entries:
+        # Syncing to an empty lock would uninstall everything
+        raise ValueError(f"Refusing to write {lock_path} without any pinned distributions")
+    lines = [
+        "# Generated by Universal Python Project Creator.",
+        f"# Resolved on {platform.system()} {platform.machine()} with Python {platform.python_version()}.",
+        "# Install without resolution:",
+        "#   pip install --no-deps --require-hashes -r requirements.lock",
+    ]
+    for entry in sorted(entries, key=lambda e: normalize_name(e['name'])):
+        # Comments can't sit inside a continued line, so filenames go first
+        for file_info in entry['files']:
+            lines.append(f"# file: {file_info['filename']}")
+        lines.append(f"{entry['name']}=={entry['version']} \\")
+        lines.append(" \\\n".join(f"    --hash=sha256:{file_info['sha256']}" for file_info in entry['files']))
+    content = "\n".join(lines) + "\n"
+    with tracer.span('write lockfile', 'file batch', path=lock_path, entries=len(entries),
+                     bytes_written=len(content.encode('utf-8'))):
+        with open(lock_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    logger.info("Wrote %s pinned artifacts to %s", len(entries), lock_path)
+
+def read_lockfile(lock_path):
+    """Parse a lockfile written by write_lockfile back into entries."""
+    entries = []
+    pending_files = []
+    with open(lock_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip().rstrip('\\').strip()
+            if line.startswith('# file: '):
+                pending_files.append({'filename': line[len('# file: '):], 'sha256': None})
+            elif line.startswith('--hash=sha256:') and entries:
+                missing = [f for f in entries[-1]['files'] if f['sha256'] is None]
+                if missing:
+                    missing[0]['sha256'] = line[len('--hash=sha256:'):]
+            elif line and not line.startswith('#') and '==' in line:
+                name, version = line.split('==', 1)
+                entries.append({'name': name.strip(), 'version': version.strip(), 'files': pending_files})
+                pending_files = []
+    return entries
+
+def get_lock_install_command(lock_path=LOCK_FILE):
+    return f"pip install --no-deps --require-hashes -r {lock_path}"
+
+def is_sync_current(venv_path, requirements_hash):
+    """True when the venv was last synced to requirements_hash and hasn't changed since."""
+    site_packages = find_site_packages(venv_path)
+    try:
+        with open(os.path.join(venv_path, SYNC_STAMP_FILE), 'r', encoding='utf-8') as f:
+            stamp = json.load(f)
+        return (site_packages is not None and stamp.get('hash') == requirements_hash
+                and stamp.get('site_packages_mtime_ns') == os.stat(site_packages).st_mtime_ns)
+    except (OSError, ValueError):
+        return False
+
+def write_sync_stamp(venv_path, requirements_hash):
+    site_packages = find_site_packages(venv_path)
+    stamp = {'hash': requirements_hash,
+             'site_packages_mtime_ns': os.stat(site_packages).st_mtime_ns if site_packages else None,
+             'synced_at': datetime.now().isoformat(timespec='seconds')}
+    with open(os.path.join(venv_path, SYNC_STAMP_FILE), 'w', encoding='utf-8') as f:
+        json.dump(stamp, f, indent=2)
+
+def get_distribution_requires(site_packages):
+    """Map normalised names to the names their installed METADATA requires.
+
+    Requirements that only apply to an extra are left out.
+    """
+    requires = {}
+    try:
+        entries = os.listdir(site_packages)
+    except OSError:
+        return requires
+    for entry in entries:
+        if not (entry.endswith('.dist-info') and '-' in entry):
+            continue
+        names = set()
+        try:
+            with open(os.path.join(site_packages, entry, 'METADATA'), 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        break
+                    if line.startswith('Requires-Dist:'):
+                        value = line[len('Requires-Dist:'):]
+                        if 'extra' not in value.partition(';')[2]:
+                            names.add(normalize_name(requirement_name(value)))
+        except OSError:
+            pass
+        requires[normalize_name(entry[:-len('.dist-info')].rsplit('-', 1)[0])] = names
+    return requires
+
+def get_unlocked_requirements(project_path, venv_path):
+    """Names installed on top of the lock: deferred profiles installed since
+    (marked by .profile-<name> files) and requirements Poetry didn't manage."""
+    metadata = load_project_metadata(project_path)
+    names = [requirement_name(r) for r in metadata.get('unmanaged_requirements', [])]
+    requirements_dir = os.path.join(project_path, 'requirements')
+    for marker in Path(venv_path).glob('.profile-*'):
+        requirements_file = os.path.join(requirements_dir, f"{marker.name[len('.profile-'):]}.txt")
+        if os.path.exists(requirements_file):
+            names += [requirement_name(r) for r in read_requirements_file(requirements_file)]
+    return {normalize_name(name) for name in names}
+
+def plan_sync(installed, entries, keep=(), requires=None):
+    """Diff installed distributions against lock entries.
+
+    Returns (entries to install or upgrade, names to uninstall). The
+    packaging tools themselves are only touched when the lock pins them,
+    and distributions in keep, along with everything they require, stay
+    installed even though the lock doesn't list them.
+    """
+    desired = {normalize_name(entry['name']): entry for entry in entries}
+    to_install = [entry for key, entry in desired.items()
+                  if key not in installed or version_key(installed[key][1]) != version_key(entry['version'])]
+    kept, pending = set(), list(keep)
+    while pending:
+        key = pending.pop()
+        if key not in kept:
+            kept.add(key)
+            pending.extend((requires or {}).get(key, ()))
+    to_remove = sorted(name for key, (name, version) in installed.items()
+                       if key not in desired and key not in kept and key not in PROTECTED_DISTRIBUTIONS)
+    return to_install, to_remove
+
+def get_base_site_packages(site_packages):
+    """The base layer site-packages an overlay chains to, or None for an ordinary venv."""
+    try:
+        with open(os.path.join(site_packages, BASE_LAYER_PTH), 'r', encoding='utf-8') as f:
+            return f.readline().strip() or None
+    except OSError:
+        return None
+
+def get_base_constraints(venv_path):
+    """Constraint lines pinning what a layered venv's base provides; empty for an ordinary venv."""
+    site_packages = find_site_packages(venv_path)
+    base_site_packages = get_base_site_packages(site_packages) if site_packages else None
+    if not base_site_packages:
+        return []
+    return sorted(f"{name}=={version}" for name, version in get_installed_distributions(base_site_packages).values())
+
+def sync_venv(venv_path, lock_path, install_args=(), fetcher=None):
+    """Bring a venv in line with a lockfile, touching only the delta.
+
+    A fetcher, when given, downloads the delta's artefacts into the
+    wheelhouse concurrently before pip runs.
+
+    Returns (installed count, removed count), or None when the install stamp
+    shows nothing changed.
+    """
+    with open(lock_path, 'rb') as f:
+        lock_hash = hashlib.sha256(f.read()).hexdigest()
+    with tracer.span('sync stamp lookup', 'cache', venv=venv_path) as span:
+        span['cache'] = 'hit' if is_sync_current(venv_path, lock_hash) else 'miss'
+    if span['cache'] == 'hit':
+        logger.info("%s already matches %s", venv_path, lock_path)
+        return None
+    
+    site_packages = find_site_packages(venv_path)
+    if not site_packages:
+        raise FileNotFoundError(f"No site-packages found in {venv_path}")
+    installed = get_installed_distributions(site_packages)
+    # An overlay sees its base layer's packages, so pins the base already satisfies aren't reinstalled
+    base_site_packages = get_base_site_packages(site_packages)
+    visible = dict(get_installed_distributions(base_site_packages), **installed) if base_site_packages else installed
+    entries = read_lockfile(lock_path)
+    if not entries:
+        raise ValueError(f"{lock_path} pins nothing; syncing to it would uninstall every distribution")
+    to_install, to_remove = plan_sync(visible, entries,
+                                      get_unlocked_requirements(os.path.dirname(os.path.abspath(venv_path)), venv_path),
+                                      get_distribution_requires(site_packages))
+    # The read-only base can't be changed from the overlay
+    to_remove = [name for name in to_remove if normalize_name(name) in installed]
+    python = get_venv_bin(venv_path, 'python')
+    
+    if to_remove:
+        logger.info("Removing %s distributions not in the lock", len(to_remove))
+        run_traced([python, '-m', 'pip', 'uninstall', '--yes', *to_remove], check=True)
+    if to_install:
+        if fetcher:
+            fetcher.fetch(to_install, get_wheel_tags(python))
+        logger.info("Installing %s changed distributions from the lock", len(to_install))
+        delta_lock = os.path.join(venv_path, 'delta_requirements.lock')
+        write_lockfile(delta_lock, to_install)
+        try:
+            run_traced([python, '-m', 'pip', 'install', *install_args, '--no-deps', '--require-hashes',
+                        '-r', delta_lock], check=True)
+        finally:
+            os.remove(delta_lock)
+    
+    write_sync_stamp(venv_path, lock_hash)
+    return len(to_install), len(to_remove)
+
+def resolve_requirements(python, requirements, install_args=(), constraints=()):
+    """Resolve a requirement set with an interpreter's pip, without installing.
+
+    constraints are preferred pins, e.g. a base layer's packages; when
+    they conflict with the requirements, the set is resolved without them.
+    Returns (lock entries, requirements that can't be pinned by hash).
+    """
+    work_dir = os.path.join(CACHE_DIR, 'resolve', uuid.uuid4().hex[:12])
+    os.makedirs(work_dir)
+    try:
+        req_path = os.path.join(work_dir, 'requirements.txt')
+        report_path = os.path.join(work_dir, 'report.json')
+        with open(req_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(requirements) + "\n")
+        command = [python, '-m', 'pip', 'install', '--quiet', '--dry-run', '--ignore-installed',
+                   *install_args, '--report', report_path, '-r', req_path]
+        try:
+            if constraints:
+                constraints_path = os.path.join(work_dir, 'constraints.txt')
+                with open(constraints_path, 'w', encoding='utf-8') as f:
+                    f.write("\n".join(constraints) + "\n")
+                try:
+                    run_traced(command + ['--constraint', constraints_path],
+                               check=True, capture_output=True, text=True)
+                except subprocess.CalledProcessError as e:
+                    logger.warning("Requirements conflict with the preferred pins, resolving without them: %s",
+                                   (e.stderr or str(e)).strip())
+                    constraints = ()
+            if not constraints:
+                run_traced(command, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Could not resolve requirements: {(e.stderr or str(e)).strip()}") from e
+        return read_pip_report(report_path, get_index_urls(install_args, python))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def install_unhashed(python, requirements, install_args=()):
+    """pip-install requirements the lock can't pin by hash. Their
+    dependencies are locked, so they're left to the lock sync."""
+    args = []
+    for requirement in requirements:
+        args += ['-e', requirement[3:]] if requirement.startswith('-e ') else [requirement]
+    run_traced([python, '-m', 'pip', 'install', '--no-deps', *install_args, *args], check=True)
+
+def compile_bytecode(venv_path, source_dirs=(), low_priority=False):
+    """Byte-compile a venv's site-packages plus source_dirs in parallel with the
+    venv's own interpreter.
+
+    Installed files never change in place, so site-packages uses
+    unchecked-hash pycs that stay valid when the venv is copied, hardlinked
+    or renamed; project sources keep timestamp checks so edits are noticed.
+    """
+    python = get_venv_bin(venv_path, 'python')
+    
+    def run_compileall(command):
+        command, kwargs = low_priority_command(command) if low_priority else (command, {})
+        run_traced(command, check=True, capture_output=True, **kwargs)
+    
+    site_packages = find_site_packages(venv_path)
+    if site_packages:
+        run_compileall([python, '-m', 'compileall', '-q', '-j', '0', '--invalidation-mode', 'unchecked-hash',
+                        site_packages])
+    source_dirs = [d for d in source_dirs if os.path.isdir(d)]
+    if source_dirs:
+        run_compileall([python, '-m', 'compileall', '-q', '-j', '0', '--invalidation-mode', 'timestamp',
+                        *source_dirs])
+
+def get_installed_distributions(site_packages):
+    """Map normalised names to (name, version) from the .dist-info directories."""
+    installed = {}
+    try:
+        entries = os.listdir(site_packages)
+    except OSError:
+        return installed
+    for entry in entries:
+        if entry.endswith('.dist-info') and '-' in entry:
+            name, version = entry[:-len('.dist-info')].rsplit('-', 1)
+            installed[normalize_name(name)] = (name, version)
+    return installed
+
+class DependencyScanner:
+    """Offline outdated-dependency scan against a local wheelhouse or simple index.
+
+    Installed versions come straight from the venv's dist-info metadata and
+    available versions from the artifact filenames in the wheelhouse, so no
+    subprocess or network access is needed. Results are cached with a TTL.
+    """
+
+    def __init__(self, cache_path=None, ttl=3600):
+        self.cache_path = cache_path or os.path.join(CACHE_DIR, 'dependency_scan.json')
+        self.ttl = ttl
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Failed to save dependency scan cache: %s", e)
+
+    def get_available_versions(self, wheelhouse):
+        # Works for a flat wheelhouse as well as a PEP 503 per-project layout
+        available = {}
+        for dirpath, dirnames, filenames in os.walk(wheelhouse):
+            for filename in filenames:
+                parsed = parse_artifact_filename(filename)
+                if parsed:
+                    available.setdefault(normalize_name(parsed[0]), set()).add(parsed[1])
+        return {name: sorted(versions, key=version_key) for name, versions in available.items()}
+
+    def scan(self, venv_path, wheelhouse):
+        site_packages = find_site_packages(venv_path)
+        if not site_packages:
+            raise FileNotFoundError(f"No site-packages found in {venv_path}")
+        if not os.path.isdir(wheelhouse):
+            raise FileNotFoundError(f"Wheelhouse {wheelhouse} does not exist, "
+                                    "so there is nothing to compare against")
+        
+        # Every wheelhouse directory counts, so wheels added to per-project subdirectories are seen
+        fingerprint = [os.stat(site_packages).st_mtime_ns]
+        fingerprint += [[dirpath, os.stat(dirpath).st_mtime_ns]
+                        for dirpath, dirnames, filenames in os.walk(wheelhouse)]
+        cache_key = f"{os.path.abspath(site_packages)}|{os.path.abspath(wheelhouse)}"
+        cache = self.load_cache()
+        cached = cache.get(cache_key)
+        if cached and cached['fingerprint'] == fingerprint and time.time() - cached['created'] < self.ttl:
+            logger.debug("Dependency scan cache hit for %s", venv_path)
+            return cached['results']
+        
+        available = self.get_available_versions(wheelhouse)
+        results = []
+        for key, (name, installed_version) in sorted(get_installed_distributions(site_packages).items()):
+            versions = available.get(key)
+            if versions and version_key(versions[-1]) > version_key(installed_version):
+                results.append({'name': name, 'installed': installed_version, 'latest': versions[-1]})
+        
+        # Drop expired entries while we're writing anyway
+        now = time.time()
+        cache = {k: v for k, v in cache.items() if now - v['created'] < self.ttl}
+        cache[cache_key] = {'created': now, 'fingerprint': fingerprint, 'results': results}
+        self.save_cache(cache)
+        return results
+
+def is_project(path):
+    """A generated project has a venv or at least the src/tests layout."""
+    if os.path.isfile(os.path.join(path, '.venv', 'pyvenv.cfg')):
+        return True
+    return os.path.isdir(os.path.join(path, 'src')) and os.path.isdir(os.path.join(path, 'tests'))
+
+def is_poetry_project(path):
+    """Poetry owns the dependencies of a project with poetry.lock or a [tool.poetry] table."""
+    if os.path.exists(os.path.join(path, 'poetry.lock')):
+        return True
+    try:
+        with open(os.path.join(path, 'pyproject.toml'), 'r', encoding='utf-8') as f:
+            return any(line.strip() == '[tool.poetry]' for line in f)
+    except OSError:
+        return False
+
+def discover_projects(workspace_root, max_depth=3):
+    projects = []
+    root_depth = os.path.abspath(workspace_root).rstrip(os.sep).count(os.sep)
+    for dirpath, dirnames, filenames in os.walk(os.path.abspath(workspace_root)):
+        if is_project(dirpath):
+            projects.append(dirpath)
+            dirnames[:] = []  # Don't descend into a project
+            continue
+        if dirpath.count(os.sep) - root_depth >= max_depth:
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in ('node_modules', '__pycache__')]
+    return sorted(projects)
+
+class PackageInventory:
+    """SQLite index of the distributions installed in every managed .venv.
+
+    Only venvs whose site-packages mtime changed since the last refresh are
+    re-scanned, so answering "who has package X below version Y" stays fast.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(CACHE_DIR, 'inventory.db')
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS venvs (
+                    project_path TEXT PRIMARY KEY,
+                    site_packages TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    scanned_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS packages (
+                    project_path TEXT NOT NULL REFERENCES venvs(project_path) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    display_name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    PRIMARY KEY (project_path, name)
+                );
+                CREATE INDEX IF NOT EXISTS packages_by_name ON packages(name);
+            """)
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    def refresh(self, workspace_root):
+        """Re-index changed venvs below workspace_root and drop vanished ones."""
+        projects = discover_projects(workspace_root)
+        rescanned = 0
+        indexed = set()
+        with closing(self.connect()) as conn, conn:
+            known = dict(conn.execute('SELECT project_path, mtime_ns FROM venvs'))
+            for project_path in projects:
+                site_packages = find_site_packages(os.path.join(project_path, '.venv'))
+                if not site_packages:
+                    continue
+                indexed.add(project_path)
+                mtime_ns = os.stat(site_packages).st_mtime_ns
+                if known.get(project_path) == mtime_ns:
+                    continue
+                
+                conn.execute('INSERT OR REPLACE INTO venvs VALUES (?, ?, ?, ?)',
+                             (project_path, site_packages, mtime_ns, datetime.now().isoformat(timespec='seconds')))
+                conn.execute('DELETE FROM packages WHERE project_path = ?', (project_path,))
+                conn.executemany('INSERT INTO packages VALUES (?, ?, ?, ?)',
+                                 [(project_path, key, name, version) for key, (name, version)
+                                  in get_installed_distributions(site_packages).items()])
+                rescanned += 1
+            
+            # Projects that are gone or lost their venv; packages go with them by cascade
+            root = os.path.abspath(workspace_root) + os.sep
+            vanished = [(path,) for path in known if path.startswith(root) and path not in indexed]
+            conn.executemany('DELETE FROM venvs WHERE project_path = ?', vanished)
+        logger.info("Inventory refreshed: %s of %s venvs re-scanned", rescanned, len(projects))
+        return rescanned
+
+    def find_users(self, package, below=None):
+        """Return (project_path, version) pairs that have package installed,
+        optionally limited to versions lower than below."""
+        with closing(self.connect()) as conn:
+            rows = conn.execute('SELECT project_path, version FROM packages WHERE name = ? ORDER BY project_path',
+                                (normalize_name(package),)).fetchall()
+        if below:
+            rows = [row for row in rows if version_key(row[1]) < version_key(below)]
+        return rows
+
+    def packages_for(self, project_path):
+        with closing(self.connect()) as conn:
+            return conn.execute('SELECT display_name, version FROM packages WHERE project_path = ? ORDER BY name',
+                                (project_path,)).fetchall()
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def record_digest(path):
+    """sha256 in the urlsafe, unpadded base64 form used by dist-info RECORD files."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return base64.urlsafe_b64encode(digest.digest()).rstrip(b'=').decode('ascii')
+
+def update_record_hashes(site_packages, changed_paths):
+    """Refresh RECORD hash and size columns for files rewritten in place."""
+    changed = {os.path.normpath(path) for path in changed_paths}
+    with tracer.span('update RECORD hashes', 'file batch', files=len(changed)) as span:
+        span['records_written'] = rewrite_record_hashes(site_packages, changed)
+
+def rewrite_record_hashes(site_packages, changed):
+    records_written = 0
+    for entry in os.listdir(site_packages):
+        record_path = os.path.join(site_packages, entry, 'RECORD')
+        if not entry.endswith('.dist-info') or not os.path.isfile(record_path):
+            continue
+        with open(record_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        updated = False
+        for row in rows:
+            if len(row) >= 3 and row[1] and os.path.normpath(os.path.join(site_packages, row[0])) in changed:
+                path = os.path.join(site_packages, row[0])
+                row[1], row[2] = f"sha256={record_digest(path)}", str(os.path.getsize(path))
+                updated = True
+        if updated:
+            output = io.StringIO()
+            csv.writer(output, lineterminator='\n').writerows(rows)
+            with open(record_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(output.getvalue())
+            records_written += 1
+    return records_written
+
+class SimpleIndexHandler(BaseHTTPRequestHandler):
+    """Serves /simple/ pages and /files/ downloads for a LocalIndexServer."""
+
+    # Keep-alive, so clients can reuse one connection for many downloads
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug("Index server: " + format, *args)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        path = unquote(urlsplit(self.path).path)
+        parts = [part for part in path.split('/') if part]
+        index = self.server.index
+        if parts == ['simple']:
+            links = [f'<a href="/simple/{name}/">{html.escape(name)}</a><br>'
+                     for name in sorted(index.get_projects())]
+            self.send_html('Simple index', links, send_body)
+        elif len(parts) == 2 and parts[0] == 'simple':
+            artifacts = index.get_projects().get(normalize_name(parts[1]))
+            if not artifacts:
+                self.send_error(404, "Project not found")
+                return
+            links = [f'<a href="/files/{html.escape(filename)}#sha256={index.get_hash(filename)}">'
+                     f'{html.escape(filename)}</a><br>' for filename in sorted(artifacts)]
+            self.send_html(f'Links for {parts[1]}', links, send_body)
+        elif len(parts) == 2 and parts[0] == 'files':
+            self.send_artifact(parts[1], send_body)
+        else:
+            self.send_error(404)
+
+    def send_html(self, title, links, send_body):
+        body = (f'<!DOCTYPE html>\n<html><head><meta name="pypi:repository-version" content="1.0">'
+                f'<title>{html.escape(title)}</title></head><body>\n'
+                + '\n'.join(links) + '\n</body></html>\n').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_artifact(self, filename, send_body):
+        file_path = self.server.index.get_artifact_path(filename)
+        if not file_path:
+            self.send_error(404, "File not found")
+            return
+        size = os.path.getsize(file_path)
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        if range_header:
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+            if not match or not (match.group(1) or match.group(2)):
+                self.send_error(416)
+                return
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start > end or start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if not send_body:
+            return
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+class LocalIndexServer:
+    """Serve a wheelhouse directory as a PEP 503 simple index over HTTP.
+
+    Handy for team-wide installs at LAN speed and as a local stand-in for
+    PyPI in tests. sha256 digests are cached by file mtime and size.
+    """
+
+    def __init__(self, wheelhouse=None, host='127.0.0.1', port=0):
+        self.wheelhouse = wheelhouse or WHEELHOUSE_DIR
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+        self.hash_cache = {}
+        self.lock = threading.Lock()
+        self.scan_state = (None, {}, {})
+
+    @property
+    def url(self):
+        host = '127.0.0.1' if self.host in ('', '0.0.0.0') else self.host
+        return f"http://{host}:{self.port}/simple/"
+
+    def scan_wheelhouse(self):
+        # Rescan only when a directory in the wheelhouse changed
+        dir_mtimes = []
+        for dirpath, dirnames, filenames in os.walk(self.wheelhouse):
+            dir_mtimes.append((dirpath, os.stat(dirpath).st_mtime_ns))
+        with self.lock:
+            if self.scan_state[0] == dir_mtimes:
+                return self.scan_state[1], self.scan_state[2]
+        projects, paths = {}, {}
+        for dirpath, dirnames, filenames in os.walk(self.wheelhouse):
+            for filename in filenames:
+                parsed = parse_artifact_filename(filename)
+                if parsed:
+                    projects.setdefault(normalize_name(parsed[0]), []).append(filename)
+                    paths[filename] = os.path.join(dirpath, filename)
+        with self.lock:
+            self.scan_state = (dir_mtimes, projects, paths)
+        return projects, paths
+
+    def get_projects(self):
+        return self.scan_wheelhouse()[0]
+
+    def get_artifact_path(self, filename):
+        return self.scan_wheelhouse()[1].get(filename)
+
+    def get_hash(self, filename):
+        path = self.get_artifact_path(filename)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if key in self.hash_cache:
+                return self.hash_cache[key]
+        digest = file_sha256(path)
+        with self.lock:
+            self.hash_cache[key] = digest
+        return digest
+
+    def start(self):
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        self.httpd = ThreadingHTTPServer((self.host, self.port), SimpleIndexHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.index = self
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info("Local index serving %s at %s", self.wheelhouse, self.url)
+        return self.url
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            logger.info("Local index server stopped")
+
+def get_index_args(index_url):
+    """pip arguments that point an install at a custom simple index."""
+    if not index_url:
+        return []
+    args = ['--index-url', index_url]
+    host = urlsplit(index_url).hostname
+    if urlsplit(index_url).scheme == 'http' and host not in ('127.0.0.1', 'localhost'):
+        args += ['--trusted-host', host]
+    return args
+
+SIMPLE_LINK_PATTERN = re.compile(r'<a\s[^>]*href="([^"]+)"[^>]*>([^<]+)</a>', re.IGNORECASE)
+
+def get_index_urls(install_args=(), python=None):
+    """The simple indexes a pip install with these arguments would consult.
+
+    Explicit --index-url/--extra-index-url arguments win over pip's own
+    configuration (files and PIP_* variables), which falls back to PyPI.
+    """
+    args = list(install_args)
+    if '--no-index' in args:
+        return []
+    explicit = {'--index-url': [], '--extra-index-url': []}
+    for i, arg in enumerate(args):
+        for flag, urls in explicit.items():
+            if arg == flag and i + 1 < len(args):
+                urls.append(args[i + 1])
+            elif arg.startswith(flag + '='):
+                urls.append(arg.split('=', 1)[1])
+    configured = {'index-url': [], 'extra-index-url': []}
+    if not explicit['--index-url'] or not explicit['--extra-index-url']:
+        try:
+            result = run_traced([python or sys.executable, '-m', 'pip', 'config', 'list'],
+                                capture_output=True, text=True, timeout=60)
+            for line in result.stdout.splitlines():
+                key, _, value = line.partition('=')
+                option = key.rsplit('.', 1)[-1]
+                if option in configured:
+                    configured[option] = value.strip().strip('\'"').split()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug("Could not read pip configuration: %s", e)
+    index_urls = explicit['--index-url'] or configured['index-url'][:1] or ['https://pypi.org/simple/']
+    urls = index_urls + explicit['--extra-index-url'] + configured['extra-index-url']
+    return list(dict.fromkeys(url.rstrip('/') + '/' for url in urls))
+
+def read_simple_page(index_url, name, pool):
+    """Return [(filename, absolute link)] from a project's page on a simple index.
+
+    file:// indexes are read straight from disk, whether they hold
+    index.html pages or plain directories of files. Returns None when the
+    index doesn't have the project.
+    """
+    page_url = urljoin(index_url, f'{normalize_name(name)}/')
+    if urlsplit(page_url).scheme == 'file':
+        page_path = url2pathname(urlsplit(page_url).path)
+        if not os.path.isdir(page_path):
+            return None
+        index_path = os.path.join(page_path, 'index.html')
+        if not os.path.exists(index_path):
+            return [(filename, Path(page_path, filename).as_uri()) for filename in sorted(os.listdir(page_path))]
+        with open(index_path, 'r', encoding='utf-8', errors='replace') as f:
+            body = f.read()
+        page_url = Path(index_path).as_uri()
+    else:
+        response, release = pool.request(page_url, {'Accept': 'text/html'})
+        body = response.read().decode('utf-8', errors='replace')
+        release()
+        if response.status == 404:
+            return None
+        if response.status != 200:
+            raise RuntimeError(f"Index returned {response.status} for {page_url}")
+    return [(html.unescape(text).strip(), urljoin(page_url, html.unescape(href)))
+            for href, text in SIMPLE_LINK_PATTERN.findall(body)]
+
+def index_release_files(name, version, index_urls, pool):
+    """Return {filename: sha256} for every file the indexes publish for one release.
+
+    Links without a #sha256 fragment are only usable from file:// indexes,
+    where the file can be hashed locally; unreachable indexes are skipped.
+    """
+    files = {}
+    for index_url in index_urls:
+        try:
+            links = read_simple_page(index_url, name, pool) or []
+        except (OSError, RuntimeError, http.client.HTTPException) as e:
+            logger.warning("Could not read %s for release hashes: %s", index_url, e)
+            continue
+        
+        for filename, url in links:
+            parsed = parse_artifact_filename(filename)
+            if (filename in files or parsed is None or normalize_name(parsed[0]) != normalize_name(name)
+                    or version_key(parsed[1]) != version_key(version)):
+                continue
+            link, _, fragment = url.partition('#')
+            if fragment.startswith('sha256='):
+                files[filename] = fragment[len('sha256='):]
+            elif urlsplit(link).scheme == 'file':
+                local_path = url2pathname(urlsplit(link).path)
+                if os.path.exists(local_path):
+                    files[filename] = file_sha256(local_path)
+    return files
+
+class ToolCache:
+    """Isolated, pipx-style venvs for the tools the creator shells out to.
+
+    Each tool is installed once into its own venv under the cache directory.
+    Lookups are served from a JSON index and only re-probe the tool's
+    version when its executable changed on disk.
+    """
+
+    TOOL_SPECS = {
+        'poetry': 'poetry>=1.4.0',
+        'pre-commit': 'pre-commit>=3.0.0',
+    }
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'tools')
+        self.index_path = os.path.join(self.cache_dir, 'tools.json')
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def probe_version(self, executable):
+        try:
+            result = run_traced([executable, '--version'], capture_output=True, text=True, check=True)
+        except (subprocess.CalledProcessError, OSError):
+            return None
+        match = re.search(r'(\d+(?:\.\d+)+)', result.stdout)
+        return match.group(1) if match else None
+
+    def meets_minimum(self, name, version):
+        minimum = self.TOOL_SPECS[name].split('>=', 1)[1]
+        return version is not None and version_key(version) >= version_key(minimum)
+
+    def build_tool(self, name):
+        tool_venv = os.path.join(self.cache_dir, name)
+        logger.info("Building isolated environment for %s", name)
+        if os.path.exists(tool_venv):
+            shutil.rmtree(tool_venv)
+        venv.create(tool_venv, with_pip=True)
+        run_traced([get_venv_bin(tool_venv, 'python'), '-m', 'pip', 'install', '--quiet',
+                    self.TOOL_SPECS[name]], check=True)
+        return get_venv_bin(tool_venv, name)
+
+    def get_tool(self, name):
+        """Return the path of a usable executable for name, building it if needed."""
+        with self.lock:
+            index = self.load_index()
+            entry = index.get(name)
+            with tracer.span('tool cache lookup', 'cache', tool=name) as span:
+                try:
+                    span['cache'] = ('hit' if entry and os.stat(entry['executable']).st_mtime_ns == entry['mtime_ns']
+                                     else 'miss')
+                except OSError:
+                    span['cache'] = 'miss'
+            if span['cache'] == 'hit':
+                touch_cache_item(os.path.join(self.cache_dir, name))
+                return entry['executable']
+            
+            executable = get_venv_bin(os.path.join(self.cache_dir, name), name)
+            version = self.probe_version(executable) if os.path.exists(executable) else None
+            if not self.meets_minimum(name, version):
+                executable = self.build_tool(name)
+                version = self.probe_version(executable)
+                if not self.meets_minimum(name, version):
+                    raise RuntimeError(f"Failed to provision {self.TOOL_SPECS[name]}")
+            
+            index[name] = {'executable': executable, 'version': version,
+                           'mtime_ns': os.stat(executable).st_mtime_ns}
+            self.save_index(index)
+            logger.debug("Using %s %s from %s", name, version, executable)
+            return executable
+
+class WheelPrefetcher:
+    """Speculatively download requirements into the wheelhouse in the background.
+
+    Each start() cancels the download in flight, so only the most recent
+    selection is fetched. Downloads are made by the interpreter the project
+    will use, so pip picks wheels for its version rather than the creator's.
+    """
+
+    def __init__(self, wheelhouse=None):
+        self.wheelhouse = wheelhouse or WHEELHOUSE_DIR
+        self.lock = threading.Lock()
+        self.process = None
+        self.generation = 0
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            if self.process and self.process.poll() is None:
+                logger.debug("Cancelling wheel prefetch")
+                self.process.terminate()
+            self.process = None
+
+    def start(self, requirements, index_args=(), python_version=None):
+        self.cancel()
+        if not requirements:
+            return
+        with self.lock:
+            generation = self.generation
+        thread = threading.Thread(target=self.run, args=(generation, list(requirements), list(index_args),
+                                                         python_version),
+                                  daemon=True)
+        thread.start()
+
+    def run(self, generation, requirements, index_args, python_version=None):
+        python = (find_interpreter(python_version) if python_version else None) or sys.executable
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        req_path = os.path.join(self.wheelhouse, f'.prefetch-{os.getpid()}-{generation}.txt')
+        try:
+            with open(req_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(requirements) + "\n")
+            with self.lock:
+                if generation != self.generation:
+                    return
+                logger.info("Prefetching %s requirements into %s", len(requirements), self.wheelhouse)
+                self.process = subprocess.Popen(
+                    [python, '-m', 'pip', 'download', '--quiet', '--prefer-binary',
+                     *index_args, '--find-links', self.wheelhouse, '-d', self.wheelhouse, '-r', req_path],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                process = self.process
+            _, stderr = process.communicate()
+            if generation == self.generation:
+                if process.returncode == 0:
+                    logger.info("Wheel prefetch complete")
+                else:
+                    logger.warning("Wheel prefetch failed: %s", stderr.strip())
+        except Exception as e:
+            logger.warning("Wheel prefetch failed: %s", e)
+        finally:
+            if os.path.exists(req_path):
+                os.remove(req_path)
+
+# pip's vendored packaging knows every tag an interpreter accepts (abi3, manylinux,
+# macOS deployment targets, ...); a standalone packaging is the fallback
+WHEEL_TAG_PROBE = ("try:\n    from pip._vendor.packaging import tags\n"
+                   "except ImportError:\n    from packaging import tags\n"
+                   "print('\\n'.join(str(tag) for tag in tags.sys_tags()))")
+
+wheel_tags = {}
+
+def get_wheel_tags(python):
+    """Return the set of wheel tags an interpreter supports, e.g. {'cp312-abi3-manylinux_2_28_x86_64', ...}."""
+    if python not in wheel_tags:
+        output = run_traced([python, '-c', WHEEL_TAG_PROBE], capture_output=True, text=True,
+                            check=True).stdout.split()
+        wheel_tags[python] = frozenset(output)
+    return wheel_tags[python]
+
+def wheel_matches_tag(filename, tags):
+    """Whether any of a wheel's (possibly compressed) tags is one the interpreter supports."""
+    parts = filename[:-4].split('-')
+    if len(parts) < 5:
+        return False
+    python_tags, abi_tags, platform_tags = (part.split('.') for part in parts[-3:])
+    return any(f'{python_tag}-{abi_tag}-{platform_tag}' in tags
+               for python_tag in python_tags for abi_tag in abi_tags for platform_tag in platform_tags)
+
+def build_sdist_wheel(python, requirement, wheelhouse, index_args=()):
+    """Build one requirement into a wheel and move it into the wheelhouse.
+
+    Runs in a worker thread; returns (filename, sha256) of the wheel.
+    """
+    build_dir = os.path.join(wheelhouse, f'.build-{uuid.uuid4().hex[:12]}')
+    os.makedirs(build_dir)
+    try:
+        run_traced([python, '-m', 'pip', 'wheel', '--quiet', '--no-deps', *index_args,
+                    '-w', build_dir, requirement], check=True, capture_output=True, text=True)
+        filename = next(name for name in os.listdir(build_dir) if name.endswith('.whl'))
+        # Build in a private directory, then publish atomically
+        os.replace(os.path.join(build_dir, filename), os.path.join(wheelhouse, filename))
+        return filename, file_sha256(os.path.join(wheelhouse, filename))
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+class SdistWheelBuilder:
+    """Build sdist-only requirements into wheels once, into the shared wheelhouse.
+
+    Wheels are matched against the target interpreter's supported tags, so each
+    sdist is built at most once per interpreter and later installs just unpack.
+    """
+
+    def __init__(self, wheelhouse=None, index_args=(), max_workers=None, governor=None):
+        self.wheelhouse = wheelhouse or WHEELHOUSE_DIR
+        self.index_args = list(index_args)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.governor = governor
+
+    def find_wheel(self, name, version, tags):
+        """Return a wheelhouse wheel for name==version usable with tags, or None."""
+        if not os.path.isdir(self.wheelhouse):
+            return None
+        for filename in os.listdir(self.wheelhouse):
+            parsed = parse_artifact_filename(filename) if filename.endswith('.whl') else None
+            if (parsed and normalize_name(parsed[0]) == normalize_name(name)
+                    and version_key(parsed[1]) == version_key(version) and wheel_matches_tag(filename, tags)):
+                return filename
+        return None
+
+    def build_wheel(self, python, entry):
+        requirement = f"{entry['name']}=={entry['version']}"
+        if self.governor:
+            with self.governor.slot('build'):
+                return build_sdist_wheel(python, requirement, self.wheelhouse, self.index_args)
+        return build_sdist_wheel(python, requirement, self.wheelhouse, self.index_args)
+
+    def build(self, python, entries):
+        """Make sure every sdist-only entry has a wheel python can install.
+
+        Returns the entries with the wheels' hashes added, so hash-checked
+        installs accept the locally built artefacts.
+        """
+        # Locks list every published file, so a release may have wheels for other platforms only
+        tags = get_wheel_tags(python)
+        sdist_entries = []
+        for entry in entries:
+            wheels = [f['filename'] for f in entry['files'] if f['filename'].endswith('.whl')]
+            if len(wheels) < len(entry['files']) and not any(wheel_matches_tag(w, tags) for w in wheels):
+                sdist_entries.append(entry)
+        if not sdist_entries:
+            return entries
+        
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        wheels = {}
+        to_build = []
+        with tracer.span('wheelhouse lookup', 'cache', python=python, sdists=len(sdist_entries)) as span:
+            for entry in sdist_entries:
+                filename = self.find_wheel(entry['name'], entry['version'], tags)
+                if filename:
+                    wheels[entry['name']] = (filename, file_sha256(os.path.join(self.wheelhouse, filename)))
+                else:
+                    to_build.append(entry)
+            span['hits'], span['misses'] = len(wheels), len(to_build)
+        logger.info("%s sdists for %s: %s cached, %s to build", len(sdist_entries), python,
+                    len(sdist_entries) - len(to_build), len(to_build))
+        
+        if to_build:
+            # Each build is a pip subprocess, so threads are enough to run them in parallel
+            with tracer.span('build sdists', 'build', count=len(to_build)), \
+                    ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_build))) as executor:
+                futures = {executor.submit(self.build_wheel, python, e): e for e in to_build}
+                for future in as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        wheels[entry['name']] = future.result()
+                        logger.info("Built %s", wheels[entry['name']][0])
+                    except Exception as e:
+                        # pip can still build it from source during the install
+                        logger.warning("Failed to build a wheel for %s: %s", entry['name'],
+                                       getattr(e, 'stderr', None) or e)
+        
+        return [dict(e, files=e['files'] + [{'filename': wheels[e['name']][0], 'sha256': wheels[e['name']][1]}])
+                if e['name'] in wheels else e for e in entries]
+
+class HTTPConnectionPool:
+    """Reusable keep-alive connections, pooled per (scheme, host, port)."""
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def get_connection(self, key):
+        with self.lock:
+            connections = self.idle.get(key)
+            if connections:
+                return connections.pop()
+        return self.new_connection(key)
+
+    def new_connection(self, key):
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=self.timeout)
+
+    def release(self, key, connection):
+        with self.lock:
+            self.idle.setdefault(key, []).append(connection)
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle = {}
+
+    def request(self, url, headers=None, max_redirects=5):
+        """GET url and return (response, release), following redirects.
+
+        The caller must read the response fully, then call release() to hand
+        the connection back to the pool.
+        """
+        for _ in range(max_redirects + 1):
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+            path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            connection = self.get_connection(key)
+            try:
+                connection.request('GET', path, headers=headers or {})
+                response = connection.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                # A pooled connection may have been closed by the server; retry on a fresh one
+                connection.close()
+                connection = self.new_connection(key)
+                connection.request('GET', path, headers=headers or {})
+                response = connection.getresponse()
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                self.release(key, connection)
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            return response, lambda key=key, connection=connection: self.release(key, connection)
+        raise RuntimeError(f"Too many redirects fetching {url}")
+
+class ArtifactFetcher:
+    """Download the artefacts of a resolved pin list into the wheelhouse.
+
+    Missing files are fetched concurrently over pooled keep-alive
+    connections from the indexes pip would use: index_url when given,
+    otherwise pip's configured index and extra indexes. Interrupted
+    downloads resume from their .part file with an HTTP Range request, and
+    every file is checked against its locked sha256 before it is published.
+    The connection pool outlives fetch() so one fetcher can serve many
+    jobs; whoever creates the fetcher close()s it.
+    """
+
+    def __init__(self, wheelhouse=None, index_url=None, max_workers=8, governor=None):
+        self.wheelhouse = wheelhouse or WHEELHOUSE_DIR
+        self.index_url = index_url
+        self.index_urls = None
+        self.max_workers = max_workers
+        self.governor = governor
+        self.pool = HTTPConnectionPool()
+        self.pages = {}
+        self.pages_lock = threading.Lock()
+        self.file_locks = {}
+
+    def close(self):
+        self.pool.close()
+
+    def get_index_urls(self):
+        with self.pages_lock:
+            if self.index_urls is None:
+                self.index_urls = get_index_urls(get_index_args(self.index_url))
+            return self.index_urls
+
+    def get_links(self, name):
+        """Return {filename: url} from the project's pages, earlier indexes first."""
+        name = normalize_name(name)
+        with self.pages_lock:
+            if name in self.pages:
+                return self.pages[name]
+        links = {}
+        for index_url in self.get_index_urls():
+            for filename, url in read_simple_page(index_url, name, self.pool) or []:
+                links.setdefault(filename, url.split('#', 1)[0])
+        with self.pages_lock:
+            self.pages[name] = links
+        return links
+
+    def choose_file(self, entry, tags=None):
+        """Pick the locked file an install would use: a matching wheel, else the sdist."""
+        wheels = [f for f in entry['files'] if f['filename'].endswith('.whl')
+                  and (tags is None or wheel_matches_tag(f['filename'], tags))]
+        sdists = [f for f in entry['files'] if not f['filename'].endswith('.whl')]
+        # Otherwise trust the resolver, which locked only the file it picked
+        candidates = wheels or sdists or entry['files']
+        return candidates[0] if candidates else None
+
+    def download(self, url, file_info):
+        with tracer.span(f"download {file_info['filename']}", 'download', url=url) as span:
+            span['bytes_written'] = self.resume_download(url, file_info)
+            return span['bytes_written']
+
+    def copy_local(self, path, file_info):
+        """Copy a file from a file:// index, checking its hash; returns bytes copied."""
+        dest = os.path.join(self.wheelhouse, file_info['filename'])
+        part_path = dest + '.part'
+        shutil.copyfile(path, part_path)
+        if file_sha256(part_path) != file_info['sha256']:
+            os.remove(part_path)
+            raise ValueError(f"Hash mismatch for {file_info['filename']}")
+        os.replace(part_path, dest)
+        return os.path.getsize(dest)
+
+    def resume_download(self, url, file_info):
+        """Download one file, resuming a partial download; returns bytes transferred."""
+        if urlsplit(url).scheme == 'file':
+            return self.copy_local(url2pathname(urlsplit(url).path), file_info)
+        dest = os.path.join(self.wheelhouse, file_info['filename'])
+        part_path = dest + '.part'
+        hasher = hashlib.sha256()
+        offset = 0
+        if os.path.exists(part_path):
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+                    offset += len(chunk)
+        
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        response, release = self.pool.request(url, headers)
+        if response.status == 416:
+            # The partial file is unusable; start over
+            response.read()
+            release()
+            os.remove(part_path)
+            return self.resume_download(url, file_info)
+        if response.status not in (200, 206):
+            response.read()
+            release()
+            raise RuntimeError(f"Download of {url} returned {response.status}")
+        if response.status == 200 and offset:
+            logger.debug("Server ignored the range request for %s, restarting", file_info['filename'])
+            hasher = hashlib.sha256()
+            offset = 0
+        
+        transferred = 0
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in iter(lambda: response.read(1024 * 1024), b''):
+                f.write(chunk)
+                hasher.update(chunk)
+                transferred += len(chunk)
+        release()
+        
+        if hasher.hexdigest() != file_info['sha256']:
+            os.remove(part_path)
+            raise ValueError(f"Hash mismatch for {file_info['filename']}")
+        os.replace(part_path, dest)
+        return transferred
+
+    def fetch_entry(self, entry, tags):
+        file_info = self.choose_file(entry, tags)
+        if file_info is None or not file_info.get('sha256'):
+            return 0
+        # Concurrent fetches of the same file must not share a .part file
+        with self.pages_lock:
+            file_lock = self.file_locks.setdefault(file_info['filename'], threading.Lock())
+        with file_lock:
+            dest = os.path.join(self.wheelhouse, file_info['filename'])
+            with tracer.span('wheelhouse lookup', 'cache', filename=file_info['filename']) as span:
+                span['cache'] = 'hit' if os.path.exists(dest) else 'miss'
+            if span['cache'] == 'hit':
+                return 0
+            url = self.get_links(entry['name']).get(file_info['filename'])
+            if url is None:
+                raise FileNotFoundError(f"{file_info['filename']} is not on {', '.join(self.get_index_urls())}")
+            if self.governor:
+                with self.governor.slot('download'):
+                    return self.download(url, file_info)
+            return self.download(url, file_info)
+
+    def fetch(self, entries, tags=None):
+        """Fill the wheelhouse with any missing artefacts.
+
+        Returns (downloaded count, bytes transferred, failed names). Failures
+        are only logged, since the install can still fetch them itself.
+        """
+        os.makedirs(self.wheelhouse, exist_ok=True)
+        downloaded, transferred, failed = 0, 0, []
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_entry, entry, tags): entry for entry in entries}
+            for future in as_completed(futures):
+                try:
+                    size = future.result()
+                except Exception as e:
+                    logger.warning("Failed to fetch %s: %s", futures[future]['name'], e)
+                    failed.append(futures[future]['name'])
+                    continue
+                if size:
+                    downloaded += 1
+                    transferred += size
+        if downloaded:
+            logger.info("Fetched %s artefacts (%.1f MB) in %.1fs", downloaded, transferred / (1024 * 1024),
+                        time.time() - start)
+        return downloaded, transferred, failed
+
+INTERPRETER_PROBE = ("import json, platform, sys; print(json.dumps({"
+                     "'version': '%d.%d' % sys.version_info[:2], "
+                     "'full_version': platform.python_version(), "
+                     "'implementation': platform.python_implementation(), "
+                     "'executable': sys.executable, "
+                     "'in_venv': sys.prefix != sys.base_prefix}))")
+
+class InterpreterDiscovery:
+    """Find the Python interpreters installed on this machine.
+
+    PATH and the usual install locations are scanned for python executables,
+    each one is probed once, and the probe results are cached keyed by the
+    executable's mtime so repeat runs don't start any subprocess.
+    """
+
+    NAME_PATTERN = re.compile(r'^python(\d(\.\d+)?)?(\.exe)?$', re.IGNORECASE)
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(CACHE_DIR, 'interpreters.json')
+        self.interpreters = None
+        self.lock = threading.Lock()
+
+    def get_search_dirs(self):
+        dirs = os.environ.get('PATH', '').split(os.pathsep)
+        home = os.path.expanduser('~')
+        if sys.platform == 'win32':
+            local_app_data = os.environ.get('LOCALAPPDATA', os.path.join(home, 'AppData', 'Local'))
+            for pattern_root in (os.path.join(local_app_data, 'Programs', 'Python'), 'C:\\'):
+                try:
+                    dirs += [os.path.join(pattern_root, d) for d in os.listdir(pattern_root)
+                             if d.lower().startswith('python3')]
+                except OSError:
+                    pass
+        else:
+            dirs += ['/usr/bin', '/usr/local/bin', '/opt/homebrew/bin', '/opt/local/bin']
+            dirs += [f'/Library/Frameworks/Python.framework/Versions/{v}/bin'
+                     for v in ('3.8', '3.9', '3.10', '3.11', '3.12', '3.13')]
+            pyenv_versions = os.path.join(os.environ.get('PYENV_ROOT', os.path.join(home, '.pyenv')), 'versions')
+            try:
+                dirs += [os.path.join(pyenv_versions, v, 'bin') for v in os.listdir(pyenv_versions)]
+            except OSError:
+                pass
+        return [d for d in dict.fromkeys(dirs) if d and 'shims' not in d.split(os.sep)]
+
+    def find_candidates(self):
+        candidates = {}
+        for directory in self.get_search_dirs():
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if self.NAME_PATTERN.match(name) and not name.lower().startswith('python2'):
+                    path = os.path.join(directory, name)
+                    real_path = os.path.realpath(path)
+                    if os.path.isfile(real_path) and os.access(real_path, os.X_OK):
+                        candidates.setdefault(real_path, path)
+        return candidates
+
+    def probe(self, executable):
+        try:
+            result = run_traced([executable, '-c', INTERPRETER_PROBE], capture_output=True,
+                                text=True, timeout=10)
+            return json.loads(result.stdout) if result.returncode == 0 else None
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            return None
+
+    def discover(self, refresh=False):
+        """Return probe results for every working interpreter, newest first."""
+        with self.lock:
+            if self.interpreters is not None and not refresh:
+                return self.interpreters
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+            
+            results, to_probe = {}, []
+            with tracer.span('interpreter cache lookup', 'cache') as span:
+                for real_path, path in self.find_candidates().items():
+                    mtime_ns = os.stat(real_path).st_mtime_ns
+                    cached = cache.get(real_path)
+                    if cached and cached['mtime_ns'] == mtime_ns:
+                        results[real_path] = cached
+                    else:
+                        to_probe.append((real_path, path, mtime_ns))
+                span['hits'], span['misses'] = len(results), len(to_probe)
+            if to_probe:
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    for (real_path, path, mtime_ns), info in zip(to_probe, executor.map(
+                            lambda item: self.probe(item[1]), to_probe)):
+                        results[real_path] = {'mtime_ns': mtime_ns, 'info': info}
+                try:
+                    os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                    with open(self.cache_path, 'w', encoding='utf-8') as f:
+                        json.dump(results, f, indent=2)
+                except OSError as e:
+                    logger.warning("Failed to save interpreter cache: %s", e)
+            
+            interpreters = {}
+            for real_path, entry in results.items():
+                info = entry['info']
+                if info and not info['in_venv']:
+                    interpreters.setdefault(info['executable'], dict(info, executable=real_path))
+            self.interpreters = sorted(interpreters.values(), key=lambda i: version_key(i['full_version']),
+                                       reverse=True)
+            return self.interpreters
+
+    def get_versions(self):
+        versions = dict.fromkeys(info['version'] for info in self.discover())
+        return sorted(versions, key=version_key)
+
+    def find(self, version):
+        for info in self.discover():
+            if info['version'] == version:
+                return info['executable']
+        return None
+
+interpreter_discovery = InterpreterDiscovery()
+
+def find_interpreter(version):
+    """Return an interpreter executable for a major.minor version, or None."""
+    return interpreter_discovery.find(version)
+
+def low_priority_command(command):
+    """Return (command, subprocess keyword arguments) that run a child at
+    reduced CPU priority.
+
+    POSIX children are started through nice(1); a preexec_fn is not safe in
+    the creator's threads.
+    """
+    if sys.platform == 'win32':
+        return list(command), {'creationflags': getattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS', 0)}
+    nice = shutil.which('nice')
+    return ([nice, '-n', '10', *command] if nice else list(command)), {}
+
+def relocate_venv(venv_path, old_path, new_path):
+    """Rewrite absolute venv paths in activation scripts, shebangs and pyvenv.cfg."""
+    old_bytes, new_bytes = old_path.encode('utf-8'), new_path.encode('utf-8')
+    bin_dir = os.path.dirname(get_venv_bin(venv_path, 'python'))
+    targets = [os.path.join(venv_path, 'pyvenv.cfg')]
+    targets += [os.path.join(bin_dir, name) for name in os.listdir(bin_dir)]
+    changed = []
+    for target in targets:
+        if not os.path.isfile(target) or os.path.islink(target) or target.endswith('.exe'):
+            continue
+        with open(target, 'rb') as f:
+            content = f.read()
+        if old_bytes in content and b'\0' not in content:
+            with open(target, 'wb') as f:
+                f.write(content.replace(old_bytes, new_bytes))
+            changed.append(target)
+    
+    # Keep RECORD in step so integrity checks don't flag the rewritten scripts
+    site_packages = find_site_packages(venv_path)
+    if site_packages and changed:
+        update_record_hashes(site_packages, changed)
+
+class VenvPool:
+    """Background-maintained pool of ready-made venvs per Python version.
+
+    take() moves a pooled venv into a project with a rename and fixes up its
+    paths; refill() tops the pool back up at low priority. Entries are
+    evicted by age and by the cache manager's venv_pool budget.
+    """
+
+    def __init__(self, pool_dir=None, target_size=1, max_age_days=7, cache_manager=None):
+        self.cache_manager = cache_manager or CacheManager()
+        self.pool_dir = pool_dir or self.cache_manager.caches['venv_pool']['path']
+        self.target_size = target_size
+        self.max_age = max_age_days * 24 * 3600
+        self.lock = threading.Lock()
+        self.cache_manager.caches['venv_pool']['lock'] = self.lock
+        self.refilling = set()
+
+    def get_ready_entries(self, version):
+        version_dir = os.path.join(self.pool_dir, version)
+        try:
+            names = [n for n in os.listdir(version_dir) if not n.endswith('.building')]
+        except OSError:
+            return []
+        entries = [os.path.join(version_dir, n) for n in names]
+        return sorted(entries, key=os.path.getmtime)
+
+    def take(self, version, destination):
+        """Move a pooled venv to destination. Returns False when none is ready."""
+        with self.lock, tracer.span('venv pool lookup', 'cache', version=version) as span:
+            span['cache'] = 'miss'
+            for entry in self.get_ready_entries(version):
+                if not read_pyvenv_cfg(entry).get('version', '').startswith(version):
+                    shutil.rmtree(entry, ignore_errors=True)
+                    continue
+                try:
+                    os.rename(entry, destination)
+                except OSError:
+                    shutil.move(entry, destination)  # Pool on another filesystem
+                relocate_venv(destination, entry, os.path.abspath(destination))
+                logger.info("Took pooled Python %s venv for %s", version, destination)
+                span['cache'] = 'hit'
+                return True
+        return False
+
+    def build_entry(self, version, interpreter):
+        version_dir = os.path.join(self.pool_dir, version)
+        os.makedirs(version_dir, exist_ok=True)
+        entry = os.path.join(version_dir, uuid.uuid4().hex[:12])
+        building = entry + '.building'
+        try:
+            command, kwargs = low_priority_command([interpreter, '-m', 'venv', building])
+            run_traced(command, check=True, capture_output=True, **kwargs)
+            relocate_venv(building, building, entry)
+            os.rename(building, entry)
+        finally:
+            if os.path.exists(building):
+                shutil.rmtree(building, ignore_errors=True)
+
+    def refill(self, version):
+        """Top up the pool for version; safe to call repeatedly."""
+        with self.lock:
+            if version in self.refilling:
+                return
+            self.refilling.add(version)
+        try:
+            interpreter = find_interpreter(version)
+            if not interpreter:
+                return
+            while len(self.get_ready_entries(version)) < self.target_size:
+                self.build_entry(version, interpreter)
+            self.evict()
+        except Exception as e:
+            logger.warning("Failed to refill Python %s venv pool: %s", version, e)
+        finally:
+            with self.lock:
+                self.refilling.discard(version)
+
+    def refill_async(self, versions):
+        for version in versions:
+            threading.Thread(target=self.refill, args=(version,), daemon=True).start()
+
+    def evict(self):
+        # Size entries without holding the lock, so take() isn't blocked by the walk
+        entries = []
+        try:
+            versions = os.listdir(self.pool_dir)
+        except OSError:
+            return
+        for version in versions:
+            entries += self.get_ready_entries(version)
+        now = time.time()
+        aged = []
+        for entry in entries:
+            try:
+                if now - os.path.getmtime(entry) > self.max_age:
+                    aged.append(entry)
+            except OSError:
+                continue  # Taken meanwhile
+        # The manager owns the disk budget, so the pool and `gc` agree on it
+        aged += [item['path'] for item in self.cache_manager.gc(dry_run=True, names=['venv_pool'])
+                 if item['path'] not in aged]
+        
+        with self.lock:
+            for entry in aged:
+                if os.path.exists(entry):
+                    logger.debug("Evicting pool venv %s", entry)
+                    shutil.rmtree(entry, ignore_errors=True)
+
+def touch_cache_item(path):
+    """Mark a cache entry as recently used for LRU eviction."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def get_layer_overlays_path(base_path):
+    return base_path + '.overlays.json'
+
+def overlay_uses_layer(venv_path, base_path):
+    site_packages = find_site_packages(venv_path)
+    base_site_packages = get_base_site_packages(site_packages) if site_packages else None
+    return bool(base_site_packages) and os.path.abspath(base_site_packages).startswith(
+        os.path.abspath(base_path) + os.sep)
+
+def is_layer_in_use(base_path):
+    """Whether any overlay registered on a base layer still chains to it."""
+    try:
+        with open(get_layer_overlays_path(base_path), 'r', encoding='utf-8') as f:
+            overlays = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return any(overlay_uses_layer(venv_path, base_path) for venv_path in overlays)
+
+class CacheManager:
+    """Tracks size and last use of every cache the creator owns and enforces
+    per-cache and global byte budgets with LRU eviction.
+
+    Each cache is a directory whose entries at a given depth are the units
+    of eviction, or a single file at depth 0; last use is the newer of an
+    entry's atime and mtime. All of them can be rebuilt on demand, except
+    entries a cache's in_use check reports as still needed. A cache's lock,
+    when set, is held while its entries are removed.
+    """
+
+    DEFAULT_CACHES = {
+        'wheelhouse': {'path': WHEELHOUSE_DIR, 'depth': 1, 'budget': 5 * 1024 ** 3},
+        'venv_pool': {'path': os.path.join(CACHE_DIR, 'venv_pool'), 'depth': 2, 'budget': 2 * 1024 ** 3},
+        'tools': {'path': os.path.join(CACHE_DIR, 'tools'), 'depth': 1, 'budget': 1024 ** 3},
+        'layers': {'path': os.path.join(CACHE_DIR, 'layers'), 'depth': 1, 'budget': 4 * 1024 ** 3,
+                   'in_use': is_layer_in_use},
+        'interpreters': {'path': os.path.join(CACHE_DIR, 'interpreters.json'), 'depth': 0, 'budget': 16 * 1024 ** 2},
+        'dependency_scan': {'path': os.path.join(CACHE_DIR, 'dependency_scan.json'), 'depth': 0,
+                            'budget': 64 * 1024 ** 2},
+        'inventory': {'path': os.path.join(CACHE_DIR, 'inventory.db'), 'depth': 0, 'budget': 256 * 1024 ** 2},
+        'doctor_hashes': {'path': os.path.join(CACHE_DIR, 'doctor_hashes.json'), 'depth': 0,
+                          'budget': 64 * 1024 ** 2},
+        'fleet_audit': {'path': os.path.join(CACHE_DIR, 'fleet_audit.json'), 'depth': 0, 'budget': 64 * 1024 ** 2},
+    }
+
+    def __init__(self, caches=None, global_budget=8 * 1024 ** 3):
+        self.caches = caches or {name: dict(info) for name, info in self.DEFAULT_CACHES.items()}
+        self.global_budget = global_budget
+
+    def get_items(self, name):
+        info = self.caches[name]
+        paths = [info['path']]
+        for level in range(info['depth']):
+            children = []
+            for path in paths:
+                if not os.path.isdir(path):
+                    continue
+                children += [os.path.join(path, entry) for entry in os.listdir(path)
+                             if not entry.startswith('.') and not entry.endswith(('.json', '.building', '.tmp'))]
+            paths = children
+        items = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            size = get_disk_usage(path) if os.path.isdir(path) else stat.st_size
+            items.append({'cache': name, 'path': path, 'size': size,
+                          'last_used': max(stat.st_atime, stat.st_mtime)})
+        return items
+
+    def status(self):
+        report = {}
+        for name in self.caches:
+            items = self.get_items(name)
+            report[name] = {
+                'path': self.caches[name]['path'],
+                'items': len(items),
+                'size': sum(item['size'] for item in items),
+                'budget': self.caches[name]['budget'],
+                'last_used': max((item['last_used'] for item in items), default=None),
+            }
+        return report
+
+    @staticmethod
+    def remove_tree(path):
+        def make_writable(function, target, exc_info):
+            # Shared base layers are read-only; their directories must be writable to empty them
+            os.chmod(os.path.dirname(target), 0o755)
+            if os.path.exists(target) and not os.path.islink(target):
+                os.chmod(target, 0o755 if os.path.isdir(target) else 0o644)
+            function(target)
+        
+        shutil.rmtree(path, onerror=make_writable)
+
+    def remove_item(self, item):
+        logger.info("Evicting %s (%.1f MB) from %s", item['path'], item['size'] / (1024 * 1024),
+                    item['cache'])
+        if os.path.isdir(item['path']):
+            self.remove_tree(item['path'])
+        else:
+            os.remove(item['path'])
+
+    def gc(self, dry_run=False, names=None):
+        """Evict least recently used entries until every budget is met.
+
+        names limits the run to some caches, leaving the global budget to a
+        full run. Returns the list of evicted items.
+        """
+        evicted = []
+        remaining = []
+        in_use_size = 0
+        for name, info in self.caches.items():
+            if names is not None and name not in names:
+                continue
+            items = sorted(self.get_items(name), key=lambda item: item['last_used'])
+            total = sum(item['size'] for item in items)
+            if info.get('in_use'):
+                # Entries still in use count towards the budgets but are never evicted
+                in_use = [item for item in items if info['in_use'](item['path'])]
+                in_use_size += sum(item['size'] for item in in_use)
+                items = [item for item in items if item not in in_use]
+            while items and total > info['budget']:
+                item = items.pop(0)
+                evicted.append(item)
+                total -= item['size']
+            remaining += items
+        
+        total = sum(item['size'] for item in remaining) + in_use_size
+        for item in sorted(remaining, key=lambda item: item['last_used']):
+            if names is not None or total <= self.global_budget:
+                break
+            evicted.append(item)
+            total -= item['size']
+        
+        if not dry_run:
+            for item in evicted:
+                try:
+                    # Holding the owner's lock keeps eviction from racing e.g. VenvPool.take()
+                    with self.caches[item['cache']].get('lock') or nullcontext():
+                        if os.path.lexists(item['path']):
+                            self.remove_item(item)
+                except OSError as e:
+                    logger.warning("Failed to evict %s: %s", item['path'], e)
+        return evicted
+
+    @staticmethod
+    def format_status(status):
+        lines = []
+        for name, info in status.items():
+            last_used = datetime.fromtimestamp(info['last_used']).strftime('%Y-%m-%d %H:%M') if info['last_used'] else 'never'
+            lines.append(f"{name}: {info['size'] / (1024 * 1024):.1f} / {info['budget'] / (1024 * 1024):.0f} MB, "
+                         f"{info['items']} entries, last used {last_used}")
+        return "\n".join(lines)
+
+class VenvMatrixBuilder:
+    """Build .venv-3.X environments for several interpreters side by side.
+
+    Venv creation runs on a pool sized to the CPU count, while installs also
+    take a slot from a small disk semaphore so concurrent unpacking doesn't
+    saturate the disk. Every environment gets the same requirement set and
+    the same wheelhouse.
+    """
+
+    def __init__(self, venv_pool=None, max_workers=None, disk_slots=2):
+        self.venv_pool = venv_pool
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.disk_semaphore = threading.BoundedSemaphore(disk_slots)
+
+    @staticmethod
+    def discover_versions():
+        return interpreter_discovery.get_versions()
+
+    def build_one(self, project_path, version, requirements, install_args):
+        interpreter = find_interpreter(version)
+        if not interpreter:
+            raise FileNotFoundError(f"Python {version} is not installed")
+        venv_path = os.path.join(project_path, f'.venv-{version}')
+        if not (self.venv_pool and self.venv_pool.take(version, venv_path)):
+            run_traced([interpreter, '-m', 'venv', venv_path], check=True, capture_output=True)
+        if requirements:
+            req_path = os.path.join(project_path, f'temp_requirements-{version}.txt')
+            with open(req_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(requirements) + "\n")
+            try:
+                with self.disk_semaphore:
+                    run_traced([get_venv_bin(venv_path, 'python'), '-m', 'pip', 'install', '--quiet',
+                                *install_args, '-r', req_path], check=True, capture_output=True, text=True)
+            finally:
+                os.remove(req_path)
+        return venv_path
+
+    def build(self, project_path, versions, requirements=(), install_args=()):
+        """Returns {version: None on success or an error message}."""
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(versions) or 1)) as executor:
+            futures = {executor.submit(self.build_one, project_path, version, list(requirements),
+                                       list(install_args)): version for version in versions}
+            for future in as_completed(futures):
+                version = futures[future]
+                try:
+                    logger.info("Built matrix venv %s", future.result())
+                    results[version] = None
+                except subprocess.CalledProcessError as e:
+                    results[version] = (e.stderr or str(e)).strip()
+                    logger.error("Failed to build Python %s matrix venv: %s", version, results[version])
+                except Exception as e:
+                    results[version] = str(e)
+                    logger.error("Failed to build Python %s matrix venv: %s", version, e)
+        if self.venv_pool:
+            self.venv_pool.refill_async(versions)
+        return results
+
+# What the slim-venv stage removes from site-packages. Directory names are only
+# pruned inside a package (never top-level), and anything under keep survives.
+DEFAULT_SLIM_RULES = {
+    'prune_dirs': ['tests', 'test', 'testing_data', 'docs', 'doc', 'examples', 'benchmarks',
+                   '.pytest_cache', '.mypy_cache'],
+    'prune_files': ['*.pyx', 'conftest.py'],
+    'keep': ['pip/', 'setuptools/', 'pkg_resources/', '_pytest/', 'pytest/'],
+}
+
+class VenvSlimmer:
+    """Prune files a project never uses (test suites, docs, build sources)
+    from site-packages and update each distribution's RECORD to match."""
+
+    def __init__(self, rules=None):
+        self.rules = rules or DEFAULT_SLIM_RULES
+
+    def is_kept(self, relative_path):
+        return any(relative_path.startswith(prefix) for prefix in self.rules['keep'])
+
+    def find_prunable(self, site_packages):
+        prunable = []
+        for dirpath, dirnames, filenames in os.walk(site_packages):
+            relative_dir = os.path.relpath(dirpath, site_packages).replace(os.sep, '/')
+            if relative_dir == '.':
+                dirnames[:] = [d for d in dirnames if not d.endswith(('.dist-info', '.egg-info'))]
+                continue
+            for dirname in list(dirnames):
+                relative_path = f"{relative_dir}/{dirname}"
+                # A directory with an __init__.py is importable, so something may still import it
+                if os.path.exists(os.path.join(dirpath, dirname, '__init__.py')):
+                    continue
+                if dirname in self.rules['prune_dirs'] and not self.is_kept(relative_path + '/'):
+                    prunable.append((relative_path, True))
+                    dirnames.remove(dirname)
+            for filename in filenames:
+                relative_path = f"{relative_dir}/{filename}"
+                if (any(fnmatch.fnmatch(filename, pattern) for pattern in self.rules['prune_files'])
+                        and not self.is_kept(relative_path)):
+                    prunable.append((relative_path, False))
+        return prunable
+
+    def update_records(self, site_packages, removed_dirs, removed_files):
+        for entry in os.listdir(site_packages):
+            record_path = os.path.join(site_packages, entry, 'RECORD')
+            if not entry.endswith('.dist-info') or not os.path.isfile(record_path):
+                continue
+            with open(record_path, 'r', encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+            kept = [row for row in rows if row and row[0] not in removed_files
+                    and not any(row[0].startswith(d + '/') for d in removed_dirs)]
+            if len(kept) != len(rows):
+                output = io.StringIO()
+                csv.writer(output, lineterminator='\n').writerows(kept)
+                with open(record_path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(output.getvalue())
+
+    def slim(self, venv_path):
+        """Prune a venv in place; returns the number of bytes freed."""
+        site_packages = find_site_packages(venv_path)
+        if not site_packages:
+            return 0
+        freed = 0
+        removed_dirs, removed_files = [], set()
+        with tracer.span('prune files', 'file batch', venv=venv_path) as span:
+            for relative_path, is_dir in self.find_prunable(site_packages):
+                path = os.path.join(site_packages, *relative_path.split('/'))
+                if is_dir:
+                    freed += get_disk_usage(path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed_dirs.append(relative_path)
+                else:
+                    freed += os.lstat(path).st_size
+                    os.remove(path)
+                    removed_files.add(relative_path)
+            span.update(dirs_removed=len(removed_dirs), files_removed=len(removed_files), bytes_freed=freed)
+        self.update_records(site_packages, removed_dirs, removed_files)
+        logger.info("Slimmed %s: freed %.1f MB", venv_path, freed / (1024 * 1024))
+        return freed
+
+class VenvDoctor:
+    """Check a venv's integrity.
+
+    Every installed file is verified against its dist-info RECORD sha256
+    (hashed in parallel, with digests cached per venv by mtime and size), pyvenv.cfg
+    is checked against the interpreter it points to, and console scripts
+    whose shebang interpreter is gone are reported.
+    """
+
+    def __init__(self, cache_path=None, max_workers=None):
+        self.cache_path = cache_path or os.path.join(CACHE_DIR, 'doctor_hashes.json')
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 2)
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Failed to save venv doctor cache: %s", e)
+
+    def get_record_entries(self, site_packages):
+        entries = []
+        for entry in os.listdir(site_packages):
+            record_path = os.path.join(site_packages, entry, 'RECORD')
+            if not entry.endswith('.dist-info') or not os.path.isfile(record_path):
+                continue
+            with open(record_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 2 and row[1].startswith('sha256='):
+                        path = os.path.normpath(os.path.join(site_packages, row[0]))
+                        entries.append((entry, path, row[1][len('sha256='):]))
+        return entries
+
+    def verify_records(self, site_packages):
+        # One section per site-packages, so deleted venvs can be dropped whole
+        cache = {key: value for key, value in self.load_cache().items()
+                 if isinstance(value, dict) and os.path.isdir(key)}
+        cache_key = os.path.abspath(site_packages)
+        digests_cache = cache.setdefault(cache_key, {})
+        problems = []
+        to_hash = []
+        for dist_info, path, expected in self.get_record_entries(site_packages):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                problems.append((path, f"missing (from {dist_info})"))
+                continue
+            cached = digests_cache.get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                if cached[2] != expected:
+                    problems.append((path, f"hash mismatch (from {dist_info})"))
+            else:
+                to_hash.append((dist_info, path, expected, stat))
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            digests = executor.map(lambda item: record_digest(item[1]), to_hash)
+            for (dist_info, path, expected, stat), digest in zip(to_hash, digests):
+                digests_cache[path] = [stat.st_mtime_ns, stat.st_size, digest]
+                if digest != expected:
+                    problems.append((path, f"hash mismatch (from {dist_info})"))
+        self.save_cache(cache)
+        return problems
+
+    def check_pyvenv(self, venv_path):
+        issues = []
+        config = read_pyvenv_cfg(venv_path)
+        if not config:
+            return ["pyvenv.cfg is missing"]
+        if not os.path.isdir(config.get('home', '')):
+            issues.append(f"base interpreter directory {config.get('home')} no longer exists")
+        try:
+            result = run_traced([get_venv_bin(venv_path, 'python'), '-c', 'import platform; print(platform.python_version())'],
+                                capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return issues + [f"venv interpreter doesn't run: {str(e)}"]
+        configured = config.get('version', config.get('version_info'))
+        if result.returncode != 0:
+            issues.append(f"venv interpreter doesn't run: {result.stderr.strip()}")
+        elif configured is not None and (version_key('.'.join(configured.split('.')[:3]))[0]
+                                         != version_key(result.stdout.strip())[0]):
+            # Poetry and virtualenv write version_info = 3.11.7.final.0, so compare the release only
+            issues.append(f"pyvenv.cfg says {configured} but the interpreter is {result.stdout.strip()}")
+        return issues
+
+    def check_scripts(self, venv_path):
+        broken = []
+        bin_dir = os.path.dirname(get_venv_bin(venv_path, 'python'))
+        for name in sorted(os.listdir(bin_dir)):
+            path = os.path.join(bin_dir, name)
+            if not os.path.isfile(path) or name.endswith('.exe'):
+                continue
+            with open(path, 'rb') as f:
+                first_line = f.readline(512)
+            if first_line.startswith(b'#!'):
+                interpreter = first_line[2:].strip().split(b' ')[0].decode('utf-8', 'replace')
+                if interpreter and not os.path.exists(interpreter):
+                    broken.append((name, interpreter))
+        return broken
+
+    def examine(self, venv_path):
+        site_packages = find_site_packages(venv_path)
+        return {
+            'files': self.verify_records(site_packages) if site_packages else [(venv_path, "no site-packages")],
+            'pyvenv': self.check_pyvenv(venv_path),
+            'scripts': self.check_scripts(venv_path) if os.path.isdir(venv_path) else [],
+        }
+
+    @staticmethod
+    def format_report(report):
+        lines = []
+        lines.append(f"{'✓' if not report['files'] else '✗'} Installed files ({len(report['files'])} problems)")
+        lines += [f"    {path}: {reason}" for path, reason in report['files'][:20]]
+        if len(report['files']) > 20:
+            lines.append(f"    ... and {len(report['files']) - 20} more")
+        lines.append(f"{'✓' if not report['pyvenv'] else '✗'} pyvenv.cfg / interpreter")
+        lines += [f"    {issue}" for issue in report['pyvenv']]
+        lines.append(f"{'✓' if not report['scripts'] else '✗'} Console scripts")
+        lines += [f"    {name}: missing interpreter {interpreter}" for name, interpreter in report['scripts']]
+        return "\n".join(lines)
+
+class VenvUpgrader:
+    """Repoint existing venvs at the newest patch release of their Python.
+
+    Uses venv's --upgrade semantics instead of rebuilding, then recompiles
+    bytecode and reinstalls only distributions whose extension modules don't
+    load under the new interpreter. Runs concurrently across projects.
+    """
+
+    SUFFIX_PROBE = "import importlib.machinery, json; print(json.dumps(importlib.machinery.EXTENSION_SUFFIXES))"
+
+    def __init__(self, max_workers=None, install_args=()):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.install_args = list(install_args)
+
+    # Only modules tagged with an interpreter version (.cpython-311-...so,
+    # .cp311-win_amd64.pyd) say which interpreter they need
+    INTERPRETER_TAGGED_EXTENSION = re.compile(
+        r'\.(?:cpython-\d+[a-z]*(?:-[^./]+)?\.so|cp\d+[a-z]*-[^./]+\.pyd|pypy\d+-pp\d+(?:-[^./]+)?\.so)$')
+
+    def find_incompatible_extensions(self, site_packages, suffixes):
+        tagged = tuple(s for s in suffixes if self.INTERPRETER_TAGGED_EXTENSION.search(s))
+        incompatible = {}
+        for entry in os.listdir(site_packages):
+            record_path = os.path.join(site_packages, entry, 'RECORD')
+            if not entry.endswith('.dist-info') or not os.path.isfile(record_path):
+                continue
+            with open(record_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    # Shared libraries vendored by auditwheel/delvewheel live in <name>.libs
+                    if not row or any(part.endswith('.libs') for part in row[0].split('/')[:-1]):
+                        continue
+                    if (self.INTERPRETER_TAGGED_EXTENSION.search(row[0])
+                            and not row[0].endswith(tagged)):
+                        name, version = entry[:-len('.dist-info')].rsplit('-', 1)
+                        incompatible[name] = version
+                        break
+        return incompatible
+
+    def upgrade(self, venv_path, interpreters=None):
+        """Returns a one-line summary of what was done.
+
+        interpreters is a discover() result to reuse; by default the
+        interpreters are rediscovered so new patch releases are seen.
+        """
+        config = read_pyvenv_cfg(venv_path)
+        current = config.get('version') or config.get('version_info', '')
+        minor = '.'.join(current.split('.')[:2])
+        interpreter = None
+        if interpreters is None:
+            interpreters = interpreter_discovery.discover(refresh=True)
+        for info in interpreters:
+            if info['version'] == minor:
+                interpreter, newest = info['executable'], info['full_version']
+                break
+        if not interpreter:
+            raise FileNotFoundError(f"No Python {minor} interpreter found")
+        if version_key(newest) <= version_key(current) and os.path.isdir(config.get('home', '')):
+            return f"already on Python {current}"
+        
+        logger.info("Upgrading %s from Python %s to %s", venv_path, current, newest)
+        # venv --upgrade leaves existing interpreter symlinks alone, so drop them first
+        bin_dir = os.path.dirname(get_venv_bin(venv_path, 'python'))
+        links = {}
+        for name in os.listdir(bin_dir):
+            if name.startswith('python') and os.path.islink(os.path.join(bin_dir, name)):
+                links[name] = os.readlink(os.path.join(bin_dir, name))
+                os.remove(os.path.join(bin_dir, name))
+        try:
+            run_traced([interpreter, '-m', 'venv', '--upgrade', venv_path], check=True, capture_output=True)
+        except Exception:
+            # Leave the venv runnable on its old interpreter
+            for name, target in links.items():
+                if not os.path.lexists(os.path.join(bin_dir, name)):
+                    os.symlink(target, os.path.join(bin_dir, name))
+            raise
         
-        logger = logging.getLogger('VenvCreator')
-        logger.setLevel(logging.DEBUG)
-        logger.handlers = []  # Clear existing handlers
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        python = get_venv_bin(venv_path, 'python')
+        result = run_traced([python, '-c', self.SUFFIX_PROBE], check=True, capture_output=True, text=True)
+        site_packages = find_site_packages(venv_path)
+        rebuilt = self.find_incompatible_extensions(site_packages, json.loads(result.stdout))
+        if rebuilt:
+            run_traced([python, '-m', 'pip', 'install', '--quiet', '--force-reinstall', '--no-deps',
+                        *self.install_args, *[f"{name}=={version}" for name, version in rebuilt.items()]],
+                       check=True, capture_output=True, text=True)
+        compile_bytecode(venv_path)
+        return f"{current} -> {newest}, rebuilt {len(rebuilt)} extension distributions"
+
+    def upgrade_many(self, venv_paths):
+        """Returns {venv_path: summary or error message}."""
+        results = {}
+        interpreters = interpreter_discovery.discover(refresh=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.upgrade, venv_path, interpreters): venv_path
+                       for venv_path in venv_paths}
+            for future in as_completed(futures):
+                venv_path = futures[future]
+                try:
+                    results[venv_path] = future.result()
+                except subprocess.CalledProcessError as e:
+                    results[venv_path] = f"failed: {(e.stderr or str(e)).strip()}"
+                except Exception as e:
+                    results[venv_path] = f"failed: {str(e)}"
+                logger.info("Interpreter upgrade %s: %s", venv_path, results[venv_path])
+        return results
+
+    @staticmethod
+    def find_venvs(paths, workspace_root=None):
+        projects = list(paths) + (discover_projects(workspace_root) if workspace_root else [])
+        venvs = []
+        for project_path in projects:
+            try:
+                entries = sorted(os.listdir(project_path))
+            except OSError:
+                continue
+            venvs += [os.path.join(project_path, e) for e in entries
+                      if (e == '.venv' or e.startswith('.venv-')) and read_pyvenv_cfg(os.path.join(project_path, e))]
+        return venvs
+
+BASE_LAYER_PTH = '_creator_base_layer.pth'
+
+class LayeredEnvironment:
+    """Shared, read-only base environments with thin per-project overlays.
+
+    A base venv is built once per interpreter version and requirement set.
+    A project venv is then an overlay without its own pip whose site-packages
+    chains to the base through a .pth file; since .pth entries are appended
+    to sys.path, packages installed in the overlay take precedence. Base
+    console scripts aren't linked into the overlay, so run tools with
+    `python -m <tool>`.
+    """
+
+    def __init__(self, layers_dir=None):
+        self.layers_dir = layers_dir or os.path.join(CACHE_DIR, 'layers')
+        self.lock = threading.Lock()
+
+    def get_base_path(self, interpreter_version, requirements):
+        key = hashlib.sha256("\n".join([interpreter_version] + sorted(requirements)).encode('utf-8')).hexdigest()
+        return os.path.join(self.layers_dir, f"py{interpreter_version}-{key[:16]}")
+
+    @staticmethod
+    def make_read_only(path):
+        if sys.platform == 'win32':
+            return
+        for dirpath, dirnames, filenames in os.walk(path):
+            for name in filenames + dirnames:
+                target = os.path.join(dirpath, name)
+                if not os.path.islink(target):
+                    os.chmod(target, os.stat(target).st_mode & ~0o222)
+        os.chmod(path, os.stat(path).st_mode & ~0o222)
+
+    def get_or_build_base(self, interpreter, requirements, install_args=()):
+        """Return the base venv for this interpreter and requirement set, building it once."""
+        full_version = run_traced([interpreter, '-c', 'import platform; print(platform.python_version())'],
+                                  check=True, capture_output=True, text=True).stdout.strip()
+        base_path = self.get_base_path(full_version, requirements)
+        with self.lock:
+            with tracer.span('base layer lookup', 'cache', base=base_path) as span:
+                span['cache'] = 'hit' if os.path.isfile(os.path.join(base_path, 'pyvenv.cfg')) else 'miss'
+            if span['cache'] == 'hit':
+                touch_cache_item(base_path)
+                return base_path
+            
+            logger.info("Building shared base layer %s", base_path)
+            building = base_path + '.building'
+            if os.path.exists(building):
+                shutil.rmtree(building)
+            try:
+                run_traced([interpreter, '-m', 'venv', building], check=True, capture_output=True)
+                if requirements:
+                    req_path = os.path.join(building, 'base_requirements.txt')
+                    with open(req_path, 'w', encoding='utf-8') as f:
+                        f.write("\n".join(requirements) + "\n")
+                    run_traced([get_venv_bin(building, 'python'), '-m', 'pip', 'install', '--quiet',
+                                *install_args, '-r', req_path], check=True, capture_output=True, text=True)
+                relocate_venv(building, building, base_path)
+                os.rename(building, base_path)
+            finally:
+                if os.path.exists(building):
+                    shutil.rmtree(building, ignore_errors=True)
+            # Compiled at its final path, since nothing can write bytecode into it later
+            compile_bytecode(base_path)
+            self.make_read_only(base_path)
+            return base_path
+
+    def create_overlay(self, venv_path, base_path, interpreter):
+        run_traced([interpreter, '-m', 'venv', '--without-pip', venv_path], check=True, capture_output=True)
+        site_packages = find_site_packages(venv_path)
+        with open(os.path.join(site_packages, BASE_LAYER_PTH), 'w', encoding='utf-8') as f:
+            f.write(find_site_packages(base_path) + "\n")
+        self.register_overlay(base_path, venv_path)
+        logger.info("Created overlay %s on base layer %s", venv_path, base_path)
+
+    def register_overlay(self, base_path, venv_path):
+        """Record an overlay next to its base, so cache GC keeps the base while the overlay uses it."""
+        overlays_path = get_layer_overlays_path(base_path)
+        with self.lock:
+            try:
+                with open(overlays_path, 'r', encoding='utf-8') as f:
+                    overlays = json.load(f)
+            except (OSError, ValueError):
+                overlays = []
+            # Drop overlays that were deleted or rebuilt on another base
+            overlays = [path for path in overlays if overlay_uses_layer(path, base_path)]
+            overlays.append(os.path.abspath(venv_path))
+            with open(overlays_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(sorted(set(overlays)), f, indent=2)
+            os.replace(overlays_path + '.tmp', overlays_path)
+
+class ConcurrencyGovernor:
+    """Global limits on parallel downloads, CPU-heavy builds and disk writes.
+
+    Workers take a named slot around each kind of work so a large fleet
+    operation keeps the build host responsive.
+    """
+
+    def __init__(self, downloads=8, builds=None, disk_writes=2):
+        self.semaphores = {
+            'download': threading.BoundedSemaphore(downloads),
+            'build': threading.BoundedSemaphore(builds or max(1, (os.cpu_count() or 2) - 1)),
+            'disk': threading.BoundedSemaphore(disk_writes),
+        }
+
+    def slot(self, kind):
+        return self.semaphores[kind]
+
+def apply_requirement_changes(requirements, changes):
+    """Replace requirements by normalised name, appending ones that are new."""
+    changed = {normalize_name(requirement_name(change)): change for change in changes}
+    updated = [changed.pop(normalize_name(requirement_name(r)), r) for r in requirements]
+    return updated + list(changed.values())
+
+class FleetUpdater:
+    """Apply a requirement change to many projects at once.
+
+    Projects are grouped by (interpreter version, requirement set) and each
+    distinct set is resolved only once; every venv is then synced to the new
+    lock concurrently, under the governor's limits.
+    """
+
+    def __init__(self, governor=None, install_args=(), max_workers=None, builder=None, fetcher=None):
+        self.governor = governor or ConcurrencyGovernor()
+        self.install_args = list(install_args)
+        self.builder = builder
+        self.fetcher = fetcher
+        if fetcher:
+            fetcher.governor = self.governor
+        if builder:
+            builder.governor = self.governor
+        self.max_workers = max_workers or min(16, (os.cpu_count() or 1) * 2)
+
+    def get_project_requirements(self, project_path):
+        requirements = load_project_metadata(project_path).get('requirements')
+        if requirements is None and os.path.exists(os.path.join(project_path, LOCK_FILE)):
+            # Older projects only have the lock, so start from its pins
+            requirements = [f"{e['name']}=={e['version']}" for e in read_lockfile(os.path.join(project_path, LOCK_FILE))]
+        return requirements
+
+    def resolve(self, venv_path, requirements):
+        python = get_venv_bin(venv_path, 'python')
+        with self.governor.slot('download'):
+            entries, unhashed = resolve_requirements(python, requirements, self.install_args,
+                                                     get_base_constraints(venv_path))
+        if self.fetcher:
+            self.fetcher.fetch(entries, get_wheel_tags(python))
+        if self.builder:
+            # The builder takes a build slot per sdist, not one for the whole set
+            entries = self.builder.build(python, entries)
+        return entries, unhashed
+
+    def sync_project(self, project_path, requirements, entries, unhashed=()):
+        # The project's lock is only replaced once its venv matches the new one
+        venv_path = os.path.join(project_path, '.venv')
+        lock_path = os.path.join(project_path, LOCK_FILE)
+        pending_lock = lock_path + '.tmp'
+        result = None
+        with self.governor.slot('disk'):
+            if entries:
+                write_lockfile(pending_lock, entries)
+                try:
+                    result = sync_venv(venv_path, pending_lock, self.install_args)
+                    os.replace(pending_lock, lock_path)
+                finally:
+                    if os.path.exists(pending_lock):
+                        os.remove(pending_lock)
+            if unhashed:
+                install_unhashed(get_venv_bin(venv_path, 'python'), unhashed, self.install_args)
+        metadata = load_project_metadata(project_path)
+        metadata['requirements'] = requirements
+        metadata['unmanaged_requirements'] = list(unhashed)
+        save_project_metadata(project_path, metadata)
+        return result
+
+    def update(self, project_paths, changes):
+        """Returns {project_path: summary or error message}."""
+        results = {}
+        groups = {}
+        for project_path in project_paths:
+            if is_poetry_project(project_path):
+                # A lock sync would fight Poetry over the venv; update these with `poetry add`
+                results[project_path] = "skipped: managed by Poetry"
+                continue
+            requirements = self.get_project_requirements(project_path)
+            if requirements is None:
+                results[project_path] = "skipped: no recorded requirements or lock"
+                continue
+            requirements = apply_requirement_changes(requirements, changes)
+            version = read_pyvenv_cfg(os.path.join(project_path, '.venv')).get('version', '')
+            groups.setdefault((version, tuple(sorted(requirements))), []).append(project_path)
+        logger.info("Bulk update: %s projects in %s distinct requirement sets",
+                    len(project_paths), len(groups))
         
-        return logger
-    except Exception as e:
-        print(f"Failed to setup logging: {str(e)}")
-        return logging.getLogger('VenvCreator')
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            resolutions = {executor.submit(self.resolve, os.path.join(paths[0], '.venv'), list(key[1])): key
+                           for key, paths in groups.items()}
+            syncs = {}
+            for future in as_completed(resolutions):
+                key = resolutions[future]
+                try:
+                    entries, unhashed = future.result()
+                except Exception as e:
+                    for project_path in groups[key]:
+                        results[project_path] = f"failed to resolve: {(getattr(e, 'stderr', None) or str(e)).strip()}"
+                    continue
+                for project_path in groups[key]:
+                    syncs[executor.submit(self.sync_project, project_path, list(key[1]), entries, unhashed)] = project_path
+            for future in as_completed(syncs):
+                project_path = syncs[future]
+                try:
+                    result = future.result()
+                    results[project_path] = ("unchanged" if result is None
+                                             else f"installed {result[0]}, removed {result[1]}")
+                except subprocess.CalledProcessError as e:
+                    results[project_path] = f"failed: {(e.stderr or str(e)).strip()}"
+                except Exception as e:
+                    results[project_path] = f"failed: {str(e)}"
+        return results
 
-# Initialize logger
-logger = setup_logging()
+class FleetAuditor:
+    """Audit every generated project below a workspace root in parallel.
 
-class ProjectTemplate:
-    def __init__(self, name, description, structure, requirements=None, configs=None):
-        self.name = name
-        self.description = description
-        self.structure = structure
-        self.requirements = requirements or []
-        self.configs = configs or {}
+    Results are cached on disk keyed by project path, so a re-run only
+    re-examines venvs whose mtimes changed since the last audit (or whose
+    entry is older than max_age). The project's own files are small and
+    are re-measured on every run.
+    """
 
-    def get_requirements(self):
-        return self.requirements
+    def __init__(self, file_structures, cache_path=None, max_workers=None, max_depth=3, max_age=24 * 3600):
+        self.file_structures = file_structures
+        self.cache_path = cache_path or os.path.join(CACHE_DIR, 'fleet_audit.json')
+        self.max_workers = max_workers or min(16, (os.cpu_count() or 1) + 4)
+        self.max_depth = max_depth
+        self.max_age = max_age
+        self.cache = self.load_cache()
 
-    def get_config_files(self):
-        return self.configs
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=2)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Failed to save fleet audit cache: %s", e)
+
+    def get_fingerprint(self, project_path):
+        # Directory mtimes change whenever entries are added or removed
+        paths = [project_path, os.path.join(project_path, '.venv'),
+                 os.path.join(project_path, '.venv', 'pyvenv.cfg')]
+        site_packages = find_site_packages(os.path.join(project_path, '.venv'))
+        if site_packages:
+            paths.append(site_packages)
+        fingerprint = []
+        for path in paths:
+            try:
+                fingerprint.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+
+    def get_source_usage(self, project_path):
+        """Disk usage of the project outside its venvs."""
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(project_path):
+            if dirpath == project_path:
+                dirnames[:] = [d for d in dirnames if not d.startswith('.venv')]
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def check_structure_drift(self, project_path):
+        # Compare against the closest known structure and report what is missing
+        try:
+            present = set(os.listdir(project_path))
+        except OSError:
+            present = set()
+        best_name, best_missing = None, None
+        for name, info in self.file_structures.items():
+            missing = sorted(set(info['structure'].keys()) - present)
+            if best_missing is None or len(missing) < len(best_missing):
+                best_name, best_missing = name, missing
+        return {'structure': best_name, 'missing': best_missing or []}
+
+    def audit_project(self, project_path):
+        venv_path = os.path.join(project_path, '.venv')
+        pyvenv = read_pyvenv_cfg(venv_path)
+        python_path = get_venv_bin(venv_path, 'python')
+        venv_healthy = bool(pyvenv) and os.path.exists(python_path) and find_site_packages(venv_path) is not None
+        return {
+            'path': project_path,
+            'venv_healthy': venv_healthy,
+            'python_version': pyvenv.get('version') or pyvenv.get('version_info'),
+            'git': os.path.exists(os.path.join(project_path, '.git')),
+            'drift': self.check_structure_drift(project_path),
+            'venv_disk_usage': sum(get_disk_usage(os.path.join(project_path, entry))
+                                   for entry in os.listdir(project_path) if entry.startswith('.venv')),
+            'audited_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def audit(self, workspace_root, progress_callback=None):
+        projects = discover_projects(workspace_root, self.max_depth)
+        results = {}
+        stale = []
+        for project_path in projects:
+            fingerprint = self.get_fingerprint(project_path)
+            cached = self.cache.get(project_path)
+            if (cached and cached.get('fingerprint') == fingerprint
+                    and time.time() - cached.get('cached_at', 0) < self.max_age):
+                results[project_path] = dict(cached['result'], drift=self.check_structure_drift(project_path))
+            else:
+                stale.append((project_path, fingerprint))
+        logger.info("Fleet audit: %s projects, %s to re-examine", len(projects), len(stale))
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.audit_project, path): (path, fp) for path, fp in stale}
+            for done, future in enumerate(as_completed(futures), 1):
+                project_path, fingerprint = futures[future]
+                try:
+                    result = future.result()
+                    self.cache[project_path] = {'fingerprint': fingerprint, 'result': result,
+                                                'cached_at': time.time()}
+                except Exception as e:
+                    logger.error("Failed to audit %s: %s", project_path, e)
+                    result = {'path': project_path, 'error': str(e)}
+                results[project_path] = result
+                if progress_callback:
+                    progress_callback(done, len(stale))
+        
+        # Forget projects that no longer exist under this root
+        root = os.path.abspath(workspace_root) + os.sep
+        for path in [p for p in self.cache if p.startswith(root) and p not in results]:
+            del self.cache[path]
+        self.save_cache()
+        for path, result in results.items():
+            if 'error' not in result:
+                result['disk_usage'] = result['venv_disk_usage'] + self.get_source_usage(path)
+        return [results[path] for path in projects]
+
+    @staticmethod
+    def format_report(results):
+        lines = []
+        for result in results:
+            name = os.path.basename(result['path'])
+            if 'error' in result:
+                lines.append(f"✗ {name}: {result['error']}")
+                continue
+            status = '✓' if result['venv_healthy'] and not result['drift']['missing'] else '✗'
+            line = (f"{status} {name}: Python {result['python_version'] or 'n/a'}, "
+                    f"{result['disk_usage'] / (1024 * 1024):.1f} MB")
+            if not result['venv_healthy']:
+                line += ", venv broken"
+            if result['drift']['missing']:
+                line += f", missing {', '.join(result['drift']['missing'])}"
+            lines.append(line)
+        return "\n".join(lines) or "No projects found"
 
 class EnhancedProjectCreator:
     def __init__(self, root):
@@ -69,7 +3122,7 @@ class EnhancedProjectCreator:
             
             # Store base directory
             self.base_dir = os.path.dirname(os.path.abspath(__file__))
-            logger.info(f"Base directory: {self.base_dir}")
+            logger.info("Base directory: %s", self.base_dir)
             
             # Load file structures from text files
             self.load_file_structures()
@@ -77,6 +3130,20 @@ class EnhancedProjectCreator:
             # Load project categories and templates
             self.load_templates()
             
+            # Shared tool environments for poetry and pre-commit
+            self.tool_cache = ToolCache()
+            self.precommit_prewarm = None
+            
+            # Background wheel prefetch, enabled once the widgets exist
+            self.prefetcher = None
+            self.prefetch_after_id = None
+            self.prefetch_key = None
+            
+            # Warm pool of ready-made venvs, one set per Python version
+            self.cache_manager = CacheManager()
+            self.venv_pool = VenvPool(cache_manager=self.cache_manager)
+            self.layers = LayeredEnvironment()
+            
             # Create main notebook for tabs
             self.notebook = ttk.Notebook(root)
             self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
@@ -87,15 +3154,19 @@ class EnhancedProjectCreator:
             self.tools_tab = ttk.Frame(self.notebook)
             self.templates_tab = ttk.Frame(self.notebook)
             self.structure_tab = ttk.Frame(self.notebook)
+            self.inventory_tab = ttk.Frame(self.notebook)
             
             self.notebook.add(self.setup_tab, text='Project Setup')
             self.notebook.add(self.options_tab, text='Configuration')
             self.notebook.add(self.tools_tab, text='Tools')
             self.notebook.add(self.templates_tab, text='Templates')
             self.notebook.add(self.structure_tab, text='Structure')
+            self.notebook.add(self.inventory_tab, text='Inventory')
             
-            # Initialize variables
-            self.python_version = tk.StringVar(value="3.9")
+            # Initialize variables; the full interpreter list arrives from a background discovery
+            host_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+            self.available_versions = [host_version]
+            self.python_version = tk.StringVar(value=host_version)
             self.test_framework = tk.StringVar(value="pytest")
             self.ci_provider = tk.StringVar(value="github")
             self.template_var = tk.StringVar()
@@ -109,6 +3180,9 @@ class EnhancedProjectCreator:
             self.create_tools_tab()
             self.create_templates_tab()
             self.create_structure_tab()
+            self.create_inventory_tab()
+            self.prefetcher = WheelPrefetcher()
+            self.python_version.trace_add('write', lambda *args: self.schedule_prefetch())
             
             # Progress bar
             self.progress = ttk.Progressbar(root, mode='determinate')
@@ -122,9 +3196,11 @@ class EnhancedProjectCreator:
             # Create Project button
             tk.Button(root, text="Create Project", command=self.create_project).pack(pady=10)
             
+            threading.Thread(target=self.discover_interpreters, daemon=True).start()
+            
             logger.info("Application initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize application: {str(e)}", exc_info=True)
+            logger.error("Failed to initialize application: %s", e, exc_info=True)
             messagebox.showerror("Error", f"Failed to initialize application: {str(e)}")
 
     def load_file_structures(self):
@@ -157,7 +3233,7 @@ class EnhancedProjectCreator:
             }
             logger.info("File structures loaded successfully")
         except Exception as e:
-            logger.error(f"Failed to load file structures: {str(e)}", exc_info=True)
+            logger.error("Failed to load file structures: %s", e, exc_info=True)
             messagebox.showerror("Error", f"Failed to load file structures: {str(e)}")
 
     def parse_structure(self, content):
@@ -245,7 +3321,8 @@ class EnhancedProjectCreator:
                 ],
                 configs={
                     "model_config.yaml": "model_parameters:\n  learning_rate: 0.01\n  max_depth: 5\n"
-                }
+                },
+                profiles=["core", "test", "lint"]
             ),
             # Add more templates here
         }
@@ -343,9 +3420,24 @@ class EnhancedProjectCreator:
         version_frame = ttk.Frame(self.setup_tab)
         version_frame.pack(fill=tk.X, padx=5, pady=5)
         ttk.Label(version_frame, text="Python Version:").pack(side=tk.LEFT)
-        version_combo = ttk.Combobox(version_frame, textvariable=self.python_version)
-        version_combo['values'] = ('3.8', '3.9', '3.10', '3.11', '3.12')
-        version_combo.pack(side=tk.LEFT, padx=5)
+        self.version_combo = ttk.Combobox(version_frame, textvariable=self.python_version, state='readonly')
+        self.version_combo['values'] = self.available_versions
+        self.version_combo.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(version_frame, text="Warm venv pool size:").pack(side=tk.LEFT, padx=(15, 0))
+        self.pool_size_var = tk.IntVar(value=self.venv_pool.target_size)
+        ttk.Spinbox(version_frame, from_=0, to=10, width=4, textvariable=self.pool_size_var).pack(side=tk.LEFT, padx=5)
+        # A trace also catches values typed into the box, which command= misses
+        self.pool_size_var.trace_add('write', lambda *args: self.on_pool_size_change())
+
+        # Matrix mode: extra side-by-side venvs for other interpreters
+        matrix_frame = ttk.LabelFrame(self.setup_tab, text="Matrix Venvs (.venv-3.X)")
+        matrix_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.matrix_vars = {}
+        self.matrix_checks = ttk.Frame(matrix_frame)
+        self.matrix_checks.pack(side=tk.LEFT)
+        self.build_matrix_checks()
+        ttk.Button(matrix_frame, text="Select All", command=self.select_all_matrix_versions).pack(side=tk.RIGHT, padx=5)
 
         # Requirements file selection
         tk.Label(self.setup_tab, text="Requirements File (optional):").pack(pady=5)
@@ -366,12 +3458,37 @@ class EnhancedProjectCreator:
         self.add_precommit = tk.BooleanVar(value=True)
         self.add_devcontainer = tk.BooleanVar(value=True)
         self.add_makefile = tk.BooleanVar(value=True)
+        self.slim_venv = tk.BooleanVar(value=False)
+        self.layered_venv = tk.BooleanVar(value=False)
         
         ttk.Checkbutton(tools_frame, text="Use Poetry", variable=self.use_poetry).pack(anchor=tk.W)
         ttk.Checkbutton(tools_frame, text="Add Docker", variable=self.add_docker).pack(anchor=tk.W)
         ttk.Checkbutton(tools_frame, text="Add Pre-commit", variable=self.add_precommit).pack(anchor=tk.W)
         ttk.Checkbutton(tools_frame, text="Add Dev Container", variable=self.add_devcontainer).pack(anchor=tk.W)
         ttk.Checkbutton(tools_frame, text="Add Makefile", variable=self.add_makefile).pack(anchor=tk.W)
+        ttk.Checkbutton(tools_frame, text="Slim venv (prune tests/docs from packages)", variable=self.slim_venv).pack(anchor=tk.W)
+        ttk.Checkbutton(tools_frame, text="Layered venv (shared template/tooling base)", variable=self.layered_venv).pack(anchor=tk.W)
+        
+        # Bytecode compilation frame
+        compile_frame = ttk.Frame(self.options_tab)
+        compile_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(compile_frame, text="Bytecode compilation:").pack(side=tk.LEFT)
+        self.compile_mode = tk.StringVar(value="background")
+        compile_combo = ttk.Combobox(compile_frame, textvariable=self.compile_mode, state='readonly', width=12)
+        compile_combo['values'] = ('eager', 'background', 'never')
+        compile_combo.pack(side=tk.LEFT, padx=5)
+        
+        # Install profiles frame
+        profiles_frame = ttk.LabelFrame(self.options_tab, text="Install Profiles (others are deferred)")
+        profiles_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.profile_vars = {}
+        for profile in PROFILE_NAMES:
+            self.profile_vars[profile] = tk.BooleanVar(value=profile in ('core', 'test'))
+            checkbutton = ttk.Checkbutton(profiles_frame, text=profile, variable=self.profile_vars[profile])
+            checkbutton.pack(side=tk.LEFT, padx=5)
+            if profile == 'core':
+                checkbutton.state(['disabled'])
         
         # CI/CD frame
         cicd_frame = ttk.LabelFrame(self.options_tab, text="CI/CD Configuration")
@@ -380,15 +3497,48 @@ class EnhancedProjectCreator:
         ttk.Radiobutton(cicd_frame, text="GitHub Actions", variable=self.ci_provider, value="github").pack(anchor=tk.W)
         ttk.Radiobutton(cicd_frame, text="GitLab CI", variable=self.ci_provider, value="gitlab").pack(anchor=tk.W)
         ttk.Radiobutton(cicd_frame, text="Jenkins", variable=self.ci_provider, value="jenkins").pack(anchor=tk.W)
+        
+        # Local package source frame
+        wheelhouse_frame = ttk.LabelFrame(self.options_tab, text="Local Wheelhouse / Index")
+        wheelhouse_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.wheelhouse_var = tk.StringVar(value=WHEELHOUSE_DIR)
+        ttk.Entry(wheelhouse_frame, textvariable=self.wheelhouse_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(wheelhouse_frame, text="Browse", command=self.browse_wheelhouse).pack(side=tk.RIGHT)
+        
+        index_frame = ttk.Frame(self.options_tab)
+        index_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(index_frame, text="Package Index URL (optional):").pack(side=tk.LEFT)
+        self.index_url_var = tk.StringVar()
+        ttk.Entry(index_frame, textvariable=self.index_url_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
     def create_tools_tab(self):
         buttons_frame = ttk.Frame(self.tools_tab)
         buttons_frame.pack(fill=tk.X, padx=5, pady=5)
         
         ttk.Button(buttons_frame, text="Check Project", command=self.check_project).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons_frame, text="Venv Doctor", command=self.run_venv_doctor).pack(fill=tk.X, pady=2)
         ttk.Button(buttons_frame, text="Backup Project", command=self.backup_project).pack(fill=tk.X, pady=2)
         ttk.Button(buttons_frame, text="Restore Backup", command=self.restore_backup).pack(fill=tk.X, pady=2)
         ttk.Button(buttons_frame, text="Scan Dependencies", command=self.scan_dependencies).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons_frame, text="Audit Workspace", command=self.audit_workspace).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons_frame, text="Sync Environment", command=self.sync_environment).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons_frame, text="Upgrade Interpreters", command=self.upgrade_interpreters).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons_frame, text="Bulk Update Requirements", command=self.bulk_update).pack(fill=tk.X, pady=2)
+        self.index_server = None
+        self.index_button = ttk.Button(buttons_frame, text="Start Local Index", command=self.toggle_local_index)
+        self.index_button.pack(fill=tk.X, pady=2)
+        
+        # Cache status panel
+        cache_frame = ttk.LabelFrame(self.tools_tab, text="Caches")
+        cache_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.cache_status_text = tk.Text(cache_frame, height=5, wrap=tk.NONE, state=tk.DISABLED)
+        self.cache_status_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        cache_buttons = ttk.Frame(cache_frame)
+        cache_buttons.pack(fill=tk.X)
+        ttk.Button(cache_buttons, text="Refresh", command=self.refresh_cache_status).pack(side=tk.LEFT, padx=5, pady=2)
+        ttk.Button(cache_buttons, text="Run GC", command=self.run_cache_gc).pack(side=tk.LEFT, padx=5, pady=2)
 
     def create_templates_tab(self):
         # Category selection
@@ -401,6 +3551,7 @@ class EnhancedProjectCreator:
         # Template selection
         tk.Label(self.templates_tab, text="Project Template:").pack(pady=5)
         self.template_dropdown = ttk.Combobox(self.templates_tab, textvariable=self.template_var)
+        self.template_dropdown['values'] = list(self.templates.keys())
         self.template_dropdown.pack(pady=5)
         self.template_dropdown.bind('<<ComboboxSelected>>', self.on_template_select)
         
@@ -453,6 +3604,37 @@ class EnhancedProjectCreator:
         
         logger.debug("Structure tab created successfully")
 
+    def create_inventory_tab(self):
+        # Workspace selection
+        tk.Label(self.inventory_tab, text="Workspace Root:").pack(pady=5)
+        workspace_frame = ttk.Frame(self.inventory_tab)
+        workspace_frame.pack(fill=tk.X, padx=5)
+        
+        self.workspace_entry = ttk.Entry(workspace_frame)
+        self.workspace_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(workspace_frame, text="Browse", command=self.browse_workspace).pack(side=tk.RIGHT)
+        ttk.Button(workspace_frame, text="Refresh Index", command=self.refresh_inventory).pack(side=tk.RIGHT)
+        
+        # Package query
+        query_frame = ttk.Frame(self.inventory_tab)
+        query_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(query_frame, text="Package:").pack(side=tk.LEFT)
+        self.inventory_package_entry = ttk.Entry(query_frame)
+        self.inventory_package_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(query_frame, text="Below version:").pack(side=tk.LEFT)
+        self.inventory_version_entry = ttk.Entry(query_frame, width=12)
+        self.inventory_version_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(query_frame, text="Find Projects", command=self.query_inventory).pack(side=tk.LEFT)
+        
+        # Results
+        self.inventory_tree = ttk.Treeview(self.inventory_tab, columns=('project', 'version'), show='headings')
+        self.inventory_tree.heading('project', text='Project')
+        self.inventory_tree.heading('version', text='Version')
+        self.inventory_tree.column('version', width=120, stretch=False)
+        self.inventory_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.inventory = PackageInventory()
+
     def on_category_select(self, event=None):
         category = self.category_var.get()
         if category in self.categories:
@@ -463,6 +3645,11 @@ class EnhancedProjectCreator:
         template = self.template_var.get()
         if template in self.project_templates:
             self.desc_label.config(text=self.project_templates[template]['description'])
+        elif template in self.templates:
+            self.desc_label.config(text=self.templates[template].description)
+            for profile, var in self.profile_vars.items():
+                var.set(profile in self.templates[template].profiles or profile == 'core')
+        self.schedule_prefetch()
 
     def on_structure_select(self, event=None):
         structure = self.structure_var.get()
@@ -479,8 +3666,39 @@ class EnhancedProjectCreator:
             self.structure_preview.insert('1.0', preview_text)
             self.structure_preview.config(state=tk.DISABLED)
             
-            logger.debug(f"Structure selected: {structure}")
-            logger.debug(f"Preview text: {preview_text}")
+            logger.debug("Structure selected: %s", structure)
+            logger.debug("Preview text: %s", preview_text)
+
+    def schedule_prefetch(self, delay_ms=500):
+        # Debounce so rapid selection changes only trigger one download
+        if self.prefetcher is None:
+            return
+        if self.prefetch_after_id:
+            self.root.after_cancel(self.prefetch_after_id)
+        self.prefetch_after_id = self.root.after(delay_ms, self.start_prefetch)
+
+    def start_prefetch(self):
+        self.prefetch_after_id = None
+        try:
+            requirements = self.get_merged_requirements()
+            index_args = get_index_args(self.index_url_var.get())
+            key = (tuple(requirements), tuple(index_args), self.wheelhouse_var.get(), self.python_version.get())
+            if key == self.prefetch_key:
+                return
+            self.prefetch_key = key
+            self.prefetcher.wheelhouse = self.wheelhouse_var.get()
+            self.prefetcher.start(requirements, index_args, self.python_version.get())
+        except Exception as e:
+            logger.warning("Failed to start wheel prefetch: %s", e)
+
+    def cancel_prefetch(self):
+        # The project's own installs take over; don't compete with them for bandwidth
+        if self.prefetch_after_id:
+            self.root.after_cancel(self.prefetch_after_id)
+            self.prefetch_after_id = None
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        self.prefetch_key = None
 
     def generate_structure_preview(self, structure_name):
         def _generate_tree(structure, prefix=""):
@@ -501,7 +3719,7 @@ class EnhancedProjectCreator:
             structure = self.file_structures[structure_name]['structure']
             tree_lines = _generate_tree(structure)
             preview = "\n".join(tree_lines)
-            logger.debug(f"Generated preview for {structure_name}:\n{preview}")
+            logger.debug("Generated preview for %s:\n%s", structure_name, preview)
             return preview
         except Exception as e:
             error_msg = f"Failed to generate preview: {str(e)}"
@@ -509,12 +3727,15 @@ class EnhancedProjectCreator:
             return error_msg
 
     def create_directory_structure(self, base_path, structure):
+        """Create the skeleton; returns the number of files and directories created."""
+        created = 0
         for name, contents in structure.items():
             path = os.path.join(base_path, name)
             
             if contents is None:
                 # Create empty file
                 Path(path).touch()
+                created += 1
             elif isinstance(contents, list):
                 # Create directory and its contents
                 os.makedirs(path, exist_ok=True)
@@ -523,10 +3744,12 @@ class EnhancedProjectCreator:
                         Path(os.path.join(path, item)).touch()
                     else:  # It's a directory
                         os.makedirs(os.path.join(path, item), exist_ok=True)
+                created += 1 + len(contents)
             elif isinstance(contents, dict):
                 # Create directory and recurse
                 os.makedirs(path, exist_ok=True)
-                self.create_directory_structure(path, contents)
+                created += 1 + self.create_directory_structure(path, contents)
+        return created
 
     def create_configuration_files(self, project_path):
         """Create configuration files with improved error handling and validation."""
@@ -547,12 +3770,12 @@ class EnhancedProjectCreator:
                     full_path = os.path.join(project_path, path)
                     os.makedirs(os.path.dirname(full_path), exist_ok=True)
                     
-                    logger.debug(f"Creating configuration file: {path}")
+                    logger.debug("Creating configuration file: %s", path)
                     with open(full_path, 'w', encoding='utf-8') as f:
                         f.write(content)
                     
         except Exception as e:
-            logger.error(f"Failed to create configuration files: {str(e)}", exc_info=True)
+            logger.error("Failed to create configuration files: %s", e, exc_info=True)
             raise
 
     def update_progress(self, value, status):
@@ -576,6 +3799,173 @@ class EnhancedProjectCreator:
         report = "\n".join([f"✓ {name}" if status else f"✗ {name}" for name, status in checks])
         messagebox.showinfo("Project Check Results", report)
 
+    def run_venv_doctor(self):
+        venv_path = os.path.join(self.dir_entry.get(), self.name_entry.get(), '.venv')
+        if not os.path.exists(venv_path):
+            messagebox.showerror("Error", "Project has no virtual environment")
+            return
+        
+        thread = threading.Thread(target=self.run_venv_doctor_thread, args=(venv_path,))
+        thread.start()
+
+    def run_venv_doctor_thread(self, venv_path):
+        try:
+            self.update_progress(50, "Verifying virtual environment")
+            report = VenvDoctor().examine(venv_path)
+            messagebox.showinfo("Venv Doctor", VenvDoctor.format_report(report))
+        except Exception as e:
+            logger.error("Failed to examine virtual environment: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to examine virtual environment: {str(e)}")
+        finally:
+            self.update_progress(0, "Ready")
+
+    def audit_workspace(self):
+        workspace_root = filedialog.askdirectory(title="Select Workspace Root")
+        if not workspace_root:
+            return
+        
+        thread = threading.Thread(target=self.audit_workspace_thread, args=(workspace_root,))
+        thread.start()
+
+    def audit_workspace_thread(self, workspace_root):
+        try:
+            auditor = FleetAuditor(self.file_structures)
+            results = auditor.audit(workspace_root,
+                progress_callback=lambda done, total: self.update_progress(
+                    done * 100 // total, f"Auditing projects ({done}/{total})"))
+            messagebox.showinfo("Workspace Audit Results", FleetAuditor.format_report(results))
+        except Exception as e:
+            logger.error("Failed to audit workspace: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to audit workspace: {str(e)}")
+        finally:
+            self.update_progress(0, "Ready")
+
+    def upgrade_interpreters(self):
+        # Current project if one is filled in, otherwise a whole workspace
+        project_path = os.path.join(self.dir_entry.get(), self.name_entry.get())
+        if self.name_entry.get() and os.path.exists(project_path):
+            paths, workspace_root = [project_path], None
+        else:
+            workspace_root = filedialog.askdirectory(title="Select Workspace Root")
+            if not workspace_root:
+                return
+            paths = []
+        
+        thread = threading.Thread(target=self.upgrade_interpreters_thread, args=(paths, workspace_root))
+        thread.start()
+
+    def upgrade_interpreters_thread(self, paths, workspace_root):
+        try:
+            self.update_progress(50, "Upgrading virtual environment interpreters")
+            upgrader = VenvUpgrader(install_args=self.get_install_args())
+            results = upgrader.upgrade_many(VenvUpgrader.find_venvs(paths, workspace_root))
+            report = "\n".join(f"{path}: {summary}" for path, summary in sorted(results.items()))
+            messagebox.showinfo("Interpreter Upgrade", report or "No virtual environments found")
+        except Exception as e:
+            logger.error("Failed to upgrade interpreters: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to upgrade interpreters: {str(e)}")
+        finally:
+            self.update_progress(0, "Ready")
+
+    def bulk_update(self):
+        changes = simpledialog.askstring("Bulk Update Requirements",
+                                         "Requirement changes (comma separated, e.g. requests>=2.32):")
+        if not changes:
+            return
+        workspace_root = filedialog.askdirectory(title="Select Workspace Root")
+        if not workspace_root:
+            return
+        
+        changes = [change.strip() for change in changes.split(',') if change.strip()]
+        thread = threading.Thread(target=self.bulk_update_thread, args=(workspace_root, changes))
+        thread.start()
+
+    def bulk_update_thread(self, workspace_root, changes):
+        try:
+            self.update_progress(50, "Updating requirements across projects")
+            projects = [p for p in discover_projects(workspace_root) if os.path.isdir(os.path.join(p, '.venv'))]
+            builder = SdistWheelBuilder(self.wheelhouse_var.get(), get_index_args(self.index_url_var.get()))
+            with closing(self.get_fetcher()) as fetcher:
+                results = FleetUpdater(install_args=self.get_install_args(), builder=builder,
+                                       fetcher=fetcher).update(projects, changes)
+            report = "\n".join(f"{os.path.basename(path)}: {summary}" for path, summary in sorted(results.items()))
+            messagebox.showinfo("Bulk Update Results", report or "No projects found")
+        except Exception as e:
+            logger.error("Failed to bulk update requirements: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to bulk update requirements: {str(e)}")
+        finally:
+            self.update_progress(0, "Ready")
+
+    def sync_environment(self):
+        project_path = os.path.join(self.dir_entry.get(), self.name_entry.get())
+        if not os.path.exists(os.path.join(project_path, LOCK_FILE)):
+            messagebox.showerror("Error", f"Project has no {LOCK_FILE} to sync against")
+            return
+        
+        thread = threading.Thread(target=self.sync_environment_thread, args=(project_path,))
+        thread.start()
+
+    def sync_environment_thread(self, project_path):
+        try:
+            self.update_progress(50, "Syncing environment")
+            with closing(self.get_fetcher()) as fetcher:
+                result = sync_venv(os.path.join(project_path, '.venv'), os.path.join(project_path, LOCK_FILE),
+                                   self.get_install_args(), fetcher)
+            if result is None:
+                messagebox.showinfo("Sync Environment", "Environment already up to date")
+            else:
+                messagebox.showinfo("Sync Environment", f"Installed {result[0]}, removed {result[1]} distributions")
+        except Exception as e:
+            logger.error("Failed to sync environment: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to sync environment: {str(e)}")
+        finally:
+            self.update_progress(0, "Ready")
+
+    def refresh_cache_status(self):
+        threading.Thread(target=self.refresh_cache_status_thread).start()
+
+    def refresh_cache_status_thread(self):
+        try:
+            report = CacheManager.format_status(self.cache_manager.status())
+        except Exception as e:
+            logger.error("Failed to read cache status: %s", e, exc_info=True)
+            report = f"Failed to read cache status: {str(e)}"
+        self.root.after(0, self.show_cache_status, report)
+
+    def show_cache_status(self, report):
+        self.cache_status_text.config(state=tk.NORMAL)
+        self.cache_status_text.delete('1.0', tk.END)
+        self.cache_status_text.insert('1.0', report)
+        self.cache_status_text.config(state=tk.DISABLED)
+
+    def run_cache_gc(self):
+        threading.Thread(target=self.run_cache_gc_thread).start()
+
+    def run_cache_gc_thread(self):
+        try:
+            evicted = self.cache_manager.gc()
+            freed = sum(item['size'] for item in evicted)
+            self.status_var.set(f"Cache GC evicted {len(evicted)} entries ({freed / (1024 * 1024):.1f} MB)")
+        except Exception as e:
+            logger.error("Failed to run cache GC: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to run cache GC: {str(e)}")
+        self.refresh_cache_status_thread()
+
+    def toggle_local_index(self):
+        try:
+            if self.index_server:
+                self.index_server.stop()
+                self.index_server = None
+                self.index_url_var.set("")
+                self.index_button.config(text="Start Local Index")
+                return
+            self.index_server = LocalIndexServer(self.wheelhouse_var.get())
+            self.index_url_var.set(self.index_server.start())
+            self.index_button.config(text="Stop Local Index")
+        except Exception as e:
+            logger.error("Failed to toggle local index: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to toggle local index: {str(e)}")
+
     def backup_project(self):
         project_path = os.path.join(self.dir_entry.get(), self.name_entry.get())
         if not os.path.exists(project_path):
@@ -613,12 +4003,9 @@ class EnhancedProjectCreator:
             return
             
         try:
-            if self.use_poetry.get():
-                result = subprocess.run(['poetry', 'show', '--outdated'], 
-                                     cwd=project_path, capture_output=True, text=True)
-                messagebox.showinfo("Dependency Scan Results", result.stdout or "All dependencies up to date")
-            else:
-                messagebox.showinfo("Info", "Dependency scanning requires Poetry")
+            results = DependencyScanner().scan(os.path.join(project_path, '.venv'), self.wheelhouse_var.get())
+            report = "\n".join(f"{r['name']}: {r['installed']} -> {r['latest']}" for r in results)
+            messagebox.showinfo("Dependency Scan Results", report or "All dependencies up to date")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to scan dependencies: {str(e)}")
 
@@ -643,13 +4030,110 @@ class EnhancedProjectCreator:
             self.dir_entry.delete(0, tk.END)
             self.dir_entry.insert(0, directory)
 
+    def build_matrix_checks(self):
+        for child in self.matrix_checks.winfo_children():
+            child.destroy()
+        self.matrix_vars = {version: self.matrix_vars.get(version) or tk.BooleanVar(value=False)
+                            for version in self.available_versions}
+        for version, var in self.matrix_vars.items():
+            ttk.Checkbutton(self.matrix_checks, text=version, variable=var).pack(side=tk.LEFT, padx=5)
+
+    def discover_interpreters(self):
+        # Probing every interpreter can take seconds, so it stays off the Tk thread
+        try:
+            versions = interpreter_discovery.get_versions()
+        except Exception as e:
+            logger.error("Interpreter discovery failed: %s", e, exc_info=True)
+            return
+        self.root.after(0, self.set_available_versions, versions)
+
+    def set_available_versions(self, versions):
+        host_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+        self.available_versions = versions or [host_version]
+        self.version_combo['values'] = self.available_versions
+        if self.python_version.get() not in self.available_versions:
+            self.python_version.set(host_version if host_version in self.available_versions
+                                    else self.available_versions[-1])
+        self.build_matrix_checks()
+        self.venv_pool.refill_async(versions)
+        logger.info("Found Python interpreters: %s", ", ".join(versions) or "none")
+
+    def select_all_matrix_versions(self):
+        for var in self.matrix_vars.values():
+            var.set(True)
+
     def browse_requirements(self):
         req_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
         if req_path:
             self.req_entry.delete(0, tk.END)
             self.req_entry.insert(0, req_path)
+            self.schedule_prefetch()
+
+    def on_pool_size_change(self):
+        try:
+            self.venv_pool.target_size = max(0, self.pool_size_var.get())
+        except tk.TclError:
+            pass  # Empty or partly typed value
+
+    def browse_wheelhouse(self):
+        wheelhouse = filedialog.askdirectory(title="Select Wheelhouse Directory")
+        if wheelhouse:
+            self.wheelhouse_var.set(wheelhouse)
+
+    def browse_workspace(self):
+        workspace = filedialog.askdirectory(title="Select Workspace Root")
+        if workspace:
+            self.workspace_entry.delete(0, tk.END)
+            self.workspace_entry.insert(0, workspace)
+
+    def refresh_inventory(self):
+        if not self.workspace_entry.get():
+            messagebox.showerror("Error", "Please select a workspace root")
+            return
+        
+        thread = threading.Thread(target=self.refresh_inventory_thread, args=(self.workspace_entry.get(),))
+        thread.start()
+
+    def refresh_inventory_thread(self, workspace_root):
+        try:
+            self.update_progress(50, "Refreshing package inventory")
+            rescanned = self.inventory.refresh(workspace_root)
+            self.status_var.set(f"Inventory refreshed ({rescanned} venvs re-scanned)")
+        except Exception as e:
+            logger.error("Failed to refresh inventory: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to refresh inventory: {str(e)}")
+        finally:
+            self.progress['value'] = 0
+
+    def query_inventory(self):
+        package = self.inventory_package_entry.get().strip()
+        if not package:
+            messagebox.showerror("Error", "Please enter a package name")
+            return
+        
+        try:
+            rows = self.inventory.find_users(package, self.inventory_version_entry.get().strip() or None)
+            self.inventory_tree.delete(*self.inventory_tree.get_children())
+            for project_path, version in rows:
+                self.inventory_tree.insert('', tk.END, values=(project_path, version))
+            self.status_var.set(f"{len(rows)} projects use {package}")
+        except Exception as e:
+            logger.error("Failed to query inventory: %s", e, exc_info=True)
+            messagebox.showerror("Error", f"Failed to query inventory: {str(e)}")
+
+    def has_lockfile(self):
+        return os.path.exists(os.path.join(self.dir_entry.get(), self.name_entry.get(), LOCK_FILE))
 
     def get_github_workflow(self):
+        if self.has_lockfile():
+            install_steps = f"""python -m pip install --upgrade pip
+        {get_lock_install_command()}"""
+            test_command = f"python -m {self.test_framework.get()}"
+        else:
+            install_steps = """python -m pip install --upgrade pip
+        pip install poetry
+        poetry install"""
+            test_command = f"poetry run {self.test_framework.get()}"
         return f"""name: Python CI
 
 on: [push, pull_request]
@@ -665,11 +4149,9 @@ jobs:
         python-version: {self.python_version.get()}
     - name: Install dependencies
       run: |
-        python -m pip install --upgrade pip
-        pip install poetry
-        poetry install
+        {install_steps}
     - name: Run tests
-      run: poetry run {self.test_framework.get()}
+      run: {test_command}
 """
 
     def get_gitlab_config(self):
@@ -705,30 +4187,60 @@ test:
 
     def setup_poetry(self, project_path):
         try:
-            # Check if poetry is installed
-            try:
-                subprocess.run(['poetry', '--version'], check=True, capture_output=True)
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                logger.warning("Poetry not found, installing...")
-                # Install poetry using pip
-                subprocess.run([sys.executable, '-m', 'pip', 'install', 'poetry'], check=True)
+            poetry = self.tool_cache.get_tool('poetry')
+            
+            selected_profiles, deferred_profiles = self.get_dev_requirements_by_profile()
+            dev_requirements = merge_requirements([(profile, requirements)
+                                                   for profile, requirements in selected_profiles.items()
+                                                   if profile != 'core'])
             
             logger.debug("Initializing poetry project")
-            subprocess.run(['poetry', 'init',
-                          '--name', self.name_entry.get(),
-                          '--description', 'A Python project',
-                          '--author', 'Author Name',
-                          '--python', f'^{self.python_version.get()}',
-                          '--dependency', self.test_framework.get(),
-                          '--dev-dependency', 'black',
-                          '--dev-dependency', 'flake8',
-                          '--no-interaction'],
-                          cwd=project_path,
-                          check=True)
-            
-            # Install dependencies
+            run_traced([poetry, 'init',
+                        '--name', self.name_entry.get(),
+                        '--description', 'A Python project',
+                        '--author', 'Author Name',
+                        '--python', f'^{self.python_version.get()}',
+                        '--dependency', self.test_framework.get(),
+                        '--no-interaction'],
+                       cwd=project_path,
+                       check=True)
+            
+            # Make Poetry build and use the project's .venv instead of its own cache
+            run_traced([poetry, 'config', '--local', 'virtualenvs.in-project', 'true'],
+                       cwd=project_path, check=True)
+            interpreter = find_interpreter(self.python_version.get())
+            if interpreter and not os.path.exists(os.path.join(project_path, '.venv')):
+                run_traced([poetry, 'env', 'use', interpreter], cwd=project_path, check=True)
+            
+            # Resolve against the local index when one is configured
+            if self.index_url_var.get():
+                run_traced([poetry, 'source', 'add', '--priority=primary', 'local',
+                            self.index_url_var.get()], cwd=project_path, check=True)
+            
+            # Lock the user's, template's and selected dev requirements, then install once
+            unmanaged = self.add_poetry_requirements(poetry, project_path,
+                                                     self.get_merged_requirements(include_dev=False))
+            unmanaged += self.add_poetry_requirements(poetry, project_path, dev_requirements, ['--group', 'dev'])
             logger.debug("Installing poetry dependencies")
-            subprocess.run(['poetry', 'install'], cwd=project_path, check=True)
+            run_traced([poetry, 'install'], cwd=project_path, check=True)
+            if unmanaged:
+                venv_python = get_venv_bin(os.path.join(project_path, '.venv'), 'python')
+                run_traced([venv_python, '-m', 'pip', 'install', *self.get_install_args(), *unmanaged], check=True)
+                metadata = load_project_metadata(project_path)
+                metadata['unmanaged_requirements'] = unmanaged
+                save_project_metadata(project_path, metadata)
+            write_deferred_profiles(project_path, deferred_profiles)
+            
+            poetry_lock = os.path.join(project_path, 'poetry.lock')
+            site_packages = find_site_packages(os.path.join(project_path, '.venv'))
+            if os.path.exists(poetry_lock) and site_packages:
+                try:
+                    entries = read_poetry_lock(poetry_lock, site_packages)
+                except RuntimeError as e:
+                    logger.warning("Not writing %s: %s", LOCK_FILE, e)
+                    entries = []
+                if entries:
+                    write_lockfile(os.path.join(project_path, LOCK_FILE), entries)
             
         except subprocess.CalledProcessError as e:
             error_msg = f"Poetry command failed: {e.stderr.decode() if e.stderr else str(e)}"
@@ -739,8 +4251,48 @@ test:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    def add_poetry_requirements(self, poetry, project_path, requirements, group_args=()):
+        """poetry add --lock the requirements Poetry can express.
+
+        Unmarked requirements go in one call; marked ones need their own. The
+        requirements Poetry rejects are returned, to be installed with pip.
+        """
+        translated, unmanaged = [], []
+        for requirement in requirements:
+            try:
+                translated.append((requirement, poetry_add_args(requirement)))
+            except ValueError:
+                unmanaged.append(requirement)
+        batch = [(requirement, args) for requirement, args in translated if len(args) == 1]
+        calls = [batch] if batch else []
+        calls += [[(requirement, args)] for requirement, args in translated if len(args) > 1]
+        
+        for call in calls:
+            try:
+                run_traced([poetry, 'add', '--lock', *group_args, *[arg for _, args in call for arg in args]],
+                           cwd=project_path, check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError as e:
+                if len(call) > 1:
+                    # Find out which ones Poetry can't take
+                    calls.extend([item] for item in call)
+                    continue
+                logger.warning("Poetry rejected %s, installing it with pip instead: %s",
+                               call[0][0], (e.stderr or e.stdout or '').strip())
+                unmanaged.append(call[0][0])
+        return unmanaged
+
     def setup_docker(self, project_path):
-        dockerfile = f"""FROM python:{self.python_version.get()}
+        if os.path.exists(os.path.join(project_path, LOCK_FILE)):
+            # Install the pinned artefacts in their own layer, before the source
+            dockerfile = f"""FROM python:{self.python_version.get()}
+WORKDIR /app
+COPY {LOCK_FILE} /app/
+RUN {get_lock_install_command()}
+COPY . /app/
+CMD ["python", "src/main.py"]
+"""
+        else:
+            dockerfile = f"""FROM python:{self.python_version.get()}
 WORKDIR /app
 COPY . /app/
 RUN pip install poetry && poetry install
@@ -749,6 +4301,16 @@ CMD ["poetry", "run", "python", "src/main.py"]
         with open(os.path.join(project_path, 'Dockerfile'), 'w') as f:
             f.write(dockerfile)
 
+    def init_git_repository(self, project_path):
+        """git init the project. Returns False when git isn't installed."""
+        git = shutil.which('git')
+        if not git:
+            logger.warning("git not found, skipping version control setup")
+            return False
+        if not os.path.exists(os.path.join(project_path, '.git')):
+            run_traced([git, 'init'], cwd=project_path, check=True, capture_output=True)
+        return True
+
     def setup_precommit(self, project_path):
         config = """repos:
 -   repo: https://github.com/pre-commit/pre-commit-hooks
@@ -769,13 +4331,31 @@ CMD ["poetry", "run", "python", "src/main.py"]
 """
         with open(os.path.join(project_path, '.pre-commit-config.yaml'), 'w') as f:
             f.write(config)
-        subprocess.run(['pre-commit', 'install'], cwd=project_path)
+        pre_commit = self.tool_cache.get_tool('pre-commit')
+        run_traced([pre_commit, 'install'], cwd=project_path)
+        
+        # Build hook environments now so the first commit doesn't have to
+        self.precommit_prewarm = threading.Thread(target=self.prewarm_precommit_hooks,
+                                                  args=(pre_commit, project_path), daemon=True)
+        self.precommit_prewarm.start()
+
+    def prewarm_precommit_hooks(self, pre_commit, project_path):
+        try:
+            logger.info("Prewarming pre-commit hook environments")
+            run_traced([pre_commit, 'install-hooks'], cwd=project_path,
+                       check=True, capture_output=True, text=True)
+            logger.info("Pre-commit hook environments ready")
+        except subprocess.CalledProcessError as e:
+            logger.warning("Failed to prewarm pre-commit hooks: %s", e.stderr or str(e))
+        except Exception as e:
+            logger.warning("Failed to prewarm pre-commit hooks: %s", e)
 
     def create_project(self):
         if not all([self.name_entry.get(), self.dir_entry.get()]):
             messagebox.showerror("Error", "Please fill in all required fields")
             return
         
+        self.cancel_prefetch()
         thread = threading.Thread(target=self.create_project_thread)
         thread.start()
 
@@ -788,22 +4368,49 @@ CMD ["poetry", "run", "python", "src/main.py"]
                 ("Configuring development tools", 40),
                 ("Setting up version control", 60),
                 ("Installing dependencies", 80),
+                ("Building interpreter matrix", 85),
+                ("Slimming virtual environments", 87),
+                ("Compiling bytecode", 88),
                 ("Finalizing project", 90)
             ]
             
             project_path = os.path.join(self.dir_entry.get(), self.name_entry.get())
+            tracer.start()
             
             for step_name, progress in steps:
                 self.update_progress(progress, step_name)
-                logger.info(f"Step: {step_name}")
-                
-                # Execute step based on name
-                if "directory structure" in step_name:
-                    self.create_directory_structure(project_path, 
-                        self.file_structures[self.structure_var.get()]['structure'])
-                elif "virtual environment" in step_name:
-                    venv.create(os.path.join(project_path, '.venv'), with_pip=True)
-                # ... handle other steps ...
+                logger.info("Step: %s", step_name)
+                with tracer.span(step_name, 'step') as span:
+                    # Execute step based on name
+                    if "directory structure" in step_name:
+                        span['entries_created'] = self.create_directory_structure(project_path, 
+                            self.file_structures[self.structure_var.get()]['structure'])
+                    elif "virtual environment" in step_name:
+                        # Poetry adopts a pooled in-project .venv, or creates one itself during install
+                        venv_path = os.path.join(project_path, '.venv')
+                        if self.layered_venv.get() and not self.use_poetry.get():
+                            self.create_layered_venv(venv_path)
+                        elif self.venv_pool.take(self.python_version.get(), venv_path):
+                            self.venv_pool.refill_async([self.python_version.get()])
+                        elif not self.use_poetry.get():
+                            self.create_venv(venv_path)
+                    elif "version control" in step_name:
+                        # Before the installs, so the hook prewarm runs alongside them
+                        if self.init_git_repository(project_path) and self.add_precommit.get():
+                            self.setup_precommit(project_path)
+                    elif "Installing dependencies" in step_name:
+                        if self.use_poetry.get():
+                            self.setup_poetry(project_path)
+                        else:
+                            self.install_requirements(project_path)
+                    elif "interpreter matrix" in step_name:
+                        self.build_venv_matrix(project_path)
+                    elif "Slimming" in step_name:
+                        if self.slim_venv.get():
+                            self.slim_project_venvs(project_path)
+                    elif "bytecode" in step_name:
+                        self.compile_project_bytecode(project_path)
+                    # ... handle other steps ...
                 
             self.update_progress(100, "Project creation complete")
             logger.info("Project created successfully")
@@ -815,6 +4422,43 @@ CMD ["poetry", "run", "python", "src/main.py"]
             messagebox.showerror("Error", error_msg)
         finally:
             self.update_progress(0, "Ready")
+            self.export_trace()
+
+    def export_trace(self):
+        """Save the spans of the last project creation for chrome://tracing or Perfetto."""
+        tracer.stop()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        trace_path = os.path.join(TRACE_DIR, f'trace_{self.name_entry.get()}_{timestamp}.json')
+        try:
+            tracer.export(trace_path)
+            # Every creation writes one, so keep only the most recent
+            traces = sorted(Path(TRACE_DIR).glob('trace_*.json'), key=lambda path: path.stat().st_mtime)
+            for old_trace in traces[:-TRACE_RETENTION]:
+                old_trace.unlink()
+        except OSError as e:
+            logger.warning("Failed to write trace: %s", e)
+
+    def create_layered_venv(self, venv_path):
+        """Build only a thin overlay on a shared base holding the template and tooling requirements."""
+        interpreter = find_interpreter(self.python_version.get())
+        if not interpreter:
+            raise Exception(f"Python {self.python_version.get()} is not installed")
+        base_requirements = self.get_merged_requirements(include_user=False)
+        base_path = self.layers.get_or_build_base(interpreter, base_requirements, self.get_install_args())
+        self.layers.create_overlay(venv_path, base_path, interpreter)
+        metadata = load_project_metadata(os.path.dirname(venv_path))
+        metadata['base_layer'] = base_path
+        save_project_metadata(os.path.dirname(venv_path), metadata)
+
+    def create_venv(self, venv_path):
+        """Create a venv with the interpreter chosen in the version combobox."""
+        interpreter = find_interpreter(self.python_version.get())
+        if not interpreter:
+            raise Exception(f"Python {self.python_version.get()} is not installed")
+        if os.path.realpath(interpreter) == os.path.realpath(sys.executable):
+            venv.create(venv_path, with_pip=True)
+        else:
+            run_traced([interpreter, '-m', 'venv', venv_path], check=True)
 
     def validate_project(self, project_path):
         """Validate the created project structure and configurations."""
@@ -848,42 +4492,259 @@ CMD ["poetry", "run", "python", "src/main.py"]
         # Log validation results
         for result in validation_results:
             log_level = logging.INFO if result['status'] else logging.WARNING
-            logger.log(log_level, f"Validation: {result['check']} - {'✓' if result['status'] else '✗'}")
+            logger.log(log_level, "Validation: %s - %s", result['check'], '✓' if result['status'] else '✗')
         
         return all(result['status'] for result in validation_results)
 
+    def get_selected_template(self):
+        return self.templates.get(self.template_var.get())
+
+    def get_merged_requirements(self, include_dev=True, include_user=True, include_template=True):
+        """Merge the user, template and development requirements, highest priority first."""
+        sources = []
+        if include_user and self.req_entry.get():
+            sources.append((self.req_entry.get(), read_requirements_file(self.req_entry.get())))
+        template = self.get_selected_template()
+        if include_template and template:
+            sources.append((f"template '{template.name}'", template.get_requirements()))
+        if include_dev:
+            selected = self.get_dev_requirements_by_profile()[0]
+            sources.append(('development requirements', [r for reqs in selected.values() for r in reqs]))
+        return merge_requirements(sources)
+
+    def get_dev_requirements_by_profile(self):
+        """Split the development requirements into (selected, deferred) profile dicts."""
+        dev_requirements = os.path.join(self.base_dir, 'requirements.txt')
+        if not os.path.exists(dev_requirements):
+            return {}, {}
+        by_profile = split_requirements_by_profile(read_requirements_file(dev_requirements))
+        selected, deferred = {}, {}
+        for profile, requirements in by_profile.items():
+            if profile == 'core' or self.profile_vars[profile].get():
+                selected[profile] = requirements
+            else:
+                deferred[profile] = merge_requirements([(profile, requirements)])
+        return selected, deferred
+
+    def get_install_args(self):
+        """pip install arguments shared by every install the creator runs."""
+        install_args = get_index_args(self.index_url_var.get())
+        if self.req_entry.get() and os.path.exists(self.req_entry.get()):
+            # Index and constraint options from the user's requirements file
+            install_args += parse_requirements_file(self.req_entry.get())[1]
+        # Created up front, so wheels the prefetcher, fetcher or builder add later are found too
+        os.makedirs(self.wheelhouse_var.get(), exist_ok=True)
+        install_args += ['--find-links', self.wheelhouse_var.get()]
+        if self.compile_mode.get() != 'never':
+            # The compile stage does this in parallel afterwards
+            install_args.append('--no-compile')
+        return install_args
+
+    def get_fetcher(self):
+        return ArtifactFetcher(self.wheelhouse_var.get(), self.index_url_var.get())
+
+    def get_project_venvs(self, project_path):
+        return [os.path.join(project_path, entry) for entry in sorted(os.listdir(project_path))
+                if entry == '.venv' or entry.startswith('.venv-')]
+
+    def slim_project_venvs(self, project_path):
+        slimmer = VenvSlimmer()
+        for venv_path in self.get_project_venvs(project_path):
+            slimmer.slim(venv_path)
+
+    def compile_project_bytecode(self, project_path):
+        mode = self.compile_mode.get()
+        if mode == 'never':
+            return
+        venv_paths = self.get_project_venvs(project_path)
+        source_dirs = [os.path.join(project_path, 'src')]
+        
+        def compile_all():
+            for venv_path in venv_paths:
+                try:
+                    compile_bytecode(venv_path, source_dirs if venv_path.endswith('.venv') else (),
+                                     low_priority=(mode == 'background'))
+                    logger.info("Byte-compiled %s", venv_path)
+                except Exception as e:
+                    logger.warning("Failed to byte-compile %s: %s", venv_path, e)
+        
+        if mode == 'eager':
+            compile_all()
+        else:
+            threading.Thread(target=compile_all, daemon=True).start()
+
+    def build_venv_matrix(self, project_path):
+        versions = [version for version, var in self.matrix_vars.items() if var.get()]
+        if not versions:
+            return
+        install_args = self.get_install_args()
+        results = VenvMatrixBuilder(self.venv_pool).build(project_path, versions,
+                                                          self.get_merged_requirements(), install_args)
+        failed = {version: error for version, error in results.items() if error}
+        if failed:
+            raise Exception("Matrix venvs failed: " + "; ".join(f"{v}: {e}" for v, e in failed.items()))
+
     def install_requirements(self, project_path):
         """Install project requirements with proper error handling."""
+        fetcher = self.get_fetcher()
         try:
-            venv_pip = os.path.join(
-                project_path, 
-                '.venv', 
-                'Scripts' if sys.platform == 'win32' else 'bin',
-                'pip'
-            )
-            
-            # Install from requirements.txt if provided
-            if self.req_entry.get():
-                logger.info(f"Installing requirements from: {self.req_entry.get()}")
-                subprocess.run([venv_pip, 'install', '-r', self.req_entry.get()], check=True)
+            venv_path = os.path.join(project_path, '.venv')
+            install_args = self.get_install_args()
             
-            # Install development requirements
-            with open('requirements.txt', 'r') as f:
-                requirements = f.read()
+            # An existing lock pins exact artefacts, so only sync the delta
+            lock_path = os.path.join(project_path, LOCK_FILE)
+            if os.path.exists(lock_path):
+                logger.info("Syncing from lockfile: %s", lock_path)
+                sync_venv(venv_path, lock_path, install_args, fetcher)
+                logger.info("Requirements installed successfully")
+                return
             
-            temp_req = os.path.join(project_path, 'temp_requirements.txt')
-            with open(temp_req, 'w') as f:
-                f.write(requirements)
+            # Layered projects lock the base's requirements too, so the lock
+            # still reproduces the whole environment outside the overlay
+            requirements = self.get_merged_requirements()
+            if not requirements:
+                logger.info("No requirements to install")
+                return
             
-            subprocess.run([venv_pip, 'install', '-r', temp_req], check=True)
-            os.remove(temp_req)
+            # Resolve everything in one go, build sdists once into the shared
+            # wheelhouse, then install the pinned set without resolution.
+            # python -m pip also works in layered overlays, which borrow pip from the base
+            python = get_venv_bin(venv_path, 'python')
+            logger.info("Resolving %s merged requirements", len(requirements))
+            # Overlays keep the base's versions where they can, so sync doesn't reinstall them
+            entries, unhashed = resolve_requirements(python, requirements, install_args,
+                                                     get_base_constraints(venv_path))
+            builder = SdistWheelBuilder(self.wheelhouse_var.get(), get_index_args(self.index_url_var.get()))
+            if entries:
+                write_lockfile(lock_path, builder.build(python, entries))
+                sync_venv(venv_path, lock_path, install_args, fetcher)
+            if unhashed:
+                # VCS checkouts and the like can't be locked; record them like Poetry's unmanaged ones
+                install_unhashed(python, unhashed, install_args)
+            metadata = load_project_metadata(project_path)
+            metadata['requirements'] = requirements
+            metadata['unmanaged_requirements'] = unhashed
+            save_project_metadata(project_path, metadata)
+            write_deferred_profiles(project_path, self.get_dev_requirements_by_profile()[1])
             
             logger.info("Requirements installed successfully")
         except Exception as e:
-            logger.error(f"Failed to install requirements: {str(e)}", exc_info=True)
+            logger.error("Failed to install requirements: %s", e, exc_info=True)
             raise
+        finally:
+            fetcher.close()
 
-if __name__ == "__main__":
+def run_command(args):
+    if args.command == 'serve-index':
+        server = LocalIndexServer(args.wheelhouse, args.host, args.port)
+        print(f"Serving {args.wheelhouse} at {server.start()}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+    
+    if args.command == 'install-profile':
+        install_deferred_profiles(args.project_path, args.profiles, args.index_url)
+        return 0
+    
+    if args.command == 'upgrade-venvs':
+        upgrader = VenvUpgrader(max_workers=args.jobs)
+        results = upgrader.upgrade_many(VenvUpgrader.find_venvs(args.projects, args.workspace))
+        for path, summary in sorted(results.items()):
+            print(f"{path}: {summary}")
+        return 0 if not any(summary.startswith('failed') for summary in results.values()) else 1
+    
+    if args.command == 'fetch':
+        with closing(ArtifactFetcher(args.wheelhouse, args.index_url, args.jobs)) as fetcher:
+            downloaded, transferred, failed = fetcher.fetch(read_lockfile(args.lock_path), get_wheel_tags(args.python))
+        print(f"Fetched {downloaded} artefacts ({transferred} bytes), {len(failed)} failed")
+        return 1 if failed else 0
+    
+    if args.command == 'bulk-update':
+        governor = ConcurrencyGovernor(args.max_downloads, args.max_builds, args.max_disk_writes)
+        projects = list(args.projects) + (discover_projects(args.workspace) if args.workspace else [])
+        index_args = get_index_args(args.index_url)
+        os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+        builder = SdistWheelBuilder(WHEELHOUSE_DIR, index_args, args.max_builds)
+        with closing(ArtifactFetcher(WHEELHOUSE_DIR, args.index_url)) as fetcher:
+            updater = FleetUpdater(governor, index_args + ['--find-links', WHEELHOUSE_DIR], builder=builder,
+                                   fetcher=fetcher)
+            results = updater.update(projects, args.changes)
+        for path, summary in sorted(results.items()):
+            print(f"{path}: {summary}")
+        return 0 if not any(summary.startswith('failed') for summary in results.values()) else 1
+    
+    if args.command == 'gc':
+        manager = CacheManager()
+        if args.global_budget_mb is not None:
+            manager.global_budget = args.global_budget_mb * 1024 * 1024
+        if not args.status:
+            evicted = manager.gc(dry_run=args.dry_run)
+            for item in evicted:
+                print(f"{'Would evict' if args.dry_run else 'Evicted'} {item['path']} "
+                      f"({item['size'] / (1024 * 1024):.1f} MB)")
+        print(CacheManager.format_status(manager.status()))
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Universal Python Project Creator")
+    parser.add_argument('--trace', metavar='PATH', help="Write a Chrome trace of the command to PATH")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    serve_parser = subparsers.add_parser('serve-index', help="Serve a wheelhouse as a PEP 503 simple index")
+    serve_parser.add_argument('--wheelhouse', default=WHEELHOUSE_DIR)
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    
+    profile_parser = subparsers.add_parser('install-profile', help="Install deferred dependency profiles")
+    profile_parser.add_argument('project_path')
+    profile_parser.add_argument('profiles', nargs='+', choices=PROFILE_NAMES)
+    profile_parser.add_argument('--index-url')
+    
+    gc_parser = subparsers.add_parser('gc', help="Evict cached data beyond the disk budgets")
+    gc_parser.add_argument('--dry-run', action='store_true')
+    gc_parser.add_argument('--status', action='store_true', help="Only show cache sizes")
+    gc_parser.add_argument('--global-budget-mb', type=int)
+    
+    upgrade_parser = subparsers.add_parser('upgrade-venvs', help="Repoint venvs at the newest patch interpreter")
+    upgrade_parser.add_argument('projects', nargs='*')
+    upgrade_parser.add_argument('--workspace')
+    upgrade_parser.add_argument('--jobs', type=int)
+    
+    bulk_parser = subparsers.add_parser('bulk-update', help="Apply requirement changes to many projects")
+    bulk_parser.add_argument('projects', nargs='*')
+    bulk_parser.add_argument('--workspace')
+    bulk_parser.add_argument('--requirement', '-r', action='append', required=True, dest='changes')
+    bulk_parser.add_argument('--index-url')
+    bulk_parser.add_argument('--max-downloads', type=int, default=8)
+    bulk_parser.add_argument('--max-builds', type=int)
+    bulk_parser.add_argument('--max-disk-writes', type=int, default=2)
+    
+    fetch_parser = subparsers.add_parser('fetch', help="Download a lockfile's artefacts into the wheelhouse")
+    fetch_parser.add_argument('lock_path')
+    fetch_parser.add_argument('--wheelhouse', default=WHEELHOUSE_DIR)
+    fetch_parser.add_argument('--index-url')
+    fetch_parser.add_argument('--python', default=sys.executable, help="Interpreter whose wheel tags to fetch for")
+    fetch_parser.add_argument('--jobs', type=int, default=8)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command and args.trace:
+        tracer.start()
+        try:
+            with tracer.span(args.command, 'command'):
+                return run_command(args)
+        finally:
+            tracer.stop()
+            tracer.export(args.trace)
+    if args.command:
+        return run_command(args)
+    
     root = tk.Tk()
     app = EnhancedProjectCreator(root)
     root.mainloop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())